@@ -5,63 +5,160 @@ Enrich EdClub competitor data by matching subdomains to districts.
 
 import json
 import re
+import string
+from bisect import bisect_right
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from difflib import SequenceMatcher
 
 DATA_DIR = Path(__file__).parent.parent / "data"
 
+# Common suffixes, stripped one after another in this order
+NAME_SUFFIXES = [
+    'school district', 'unified school district', 'public schools',
+    'city schools', 'county schools', 'independent school district',
+    'isd', 'usd', 'sd', 'ps', 'unified', 'schools', 'school', 'district',
+    'elementary', 'middle', 'high', 'academy', 'k-12', 'k12',
+]
+_SUFFIX_RES = tuple(re.compile(rf'\b{suffix}\b') for suffix in NAME_SUFFIXES)
+_PUNCT_RE = re.compile(r'[^a-z0-9\s]')
+# Same filter as _PUNCT_RE as a translate table, for the (usual) ASCII case
+_ASCII_PUNCT_TABLE = str.maketrans('', '', ''.join(
+    ch for ch in map(chr, range(128))
+    if not (ch in string.ascii_lowercase or ch in string.digits or ch.isspace())
+))
+_WS_RE = re.compile(r'\s+')
+
+@lru_cache(maxsize=None)
 def normalize_name(name: str) -> str:
     """Normalize district/school name for matching."""
     name = name.lower()
     # Remove common suffixes
-    for suffix in ['school district', 'unified school district', 'public schools', 
-                   'city schools', 'county schools', 'independent school district',
-                   'isd', 'usd', 'sd', 'ps', 'unified', 'schools', 'school', 'district',
-                   'elementary', 'middle', 'high', 'academy', 'k-12', 'k12']:
-        name = re.sub(rf'\b{suffix}\b', '', name)
+    for suffix_re in _SUFFIX_RES:
+        name = suffix_re.sub('', name)
     # Remove punctuation and extra spaces
-    name = re.sub(r'[^a-z0-9\s]', '', name)
-    name = re.sub(r'\s+', ' ', name).strip()
-    return name
+    if name.isascii():
+        name = name.translate(_ASCII_PUNCT_TABLE)
+    else:
+        name = _PUNCT_RE.sub('', name)
+    return _WS_RE.sub(' ', name).strip()
 
 def similarity(a: str, b: str) -> float:
     """Calculate similarity ratio between two strings."""
     return SequenceMatcher(None, a, b).ratio()
 
-def match_subdomain_to_district(subdomain: str, districts: list) -> dict | None:
-    """Try to match a subdomain to a district."""
+def match_all_subdomains(subdomains: list, districts: list) -> list:
+    """Match every subdomain to its best district (or None), in order.
+
+    District names and cities are normalized once up front rather than
+    once per subdomain.
+    """
+    index = index_districts(districts)
+    # Subdomains are scored independently, so spread them across one
+    # process per core; each worker receives the index once at startup
+    with ProcessPoolExecutor(initializer=_init_worker, initargs=(index,)) as pool:
+        return list(pool.map(_match_in_worker, subdomains, chunksize=64))
+
+_worker_index = None
+
+def _init_worker(index: tuple) -> None:
+    """Store the district index in a pool worker."""
+    global _worker_index
+    _worker_index = index
+
+def _match_in_worker(subdomain: str) -> dict | None:
+    """Pool task: match one subdomain against the worker's index."""
+    return _best_match(subdomain, _worker_index)
+
+def index_districts(districts: list) -> tuple:
+    """Normalize districts once and index their names for substring lookups.
+
+    Returns (entries, by_name, corpus, starts): entries are
+    (district, normalized name, lowercased city, matcher) tuples, where
+    matcher is a SequenceMatcher with the district name already set as
+    seq2; by_name maps a normalized name to entry indices, and corpus
+    joins all normalized names with newlines, entry i starting at offset
+    starts[i].
+    """
+    entries = []
+    for district in districts:
+        district_normalized = normalize_name(district['name'])
+        # SequenceMatcher caches its lookup tables for seq2, so each
+        # district builds them once instead of once per subdomain
+        matcher = SequenceMatcher(None, '', district_normalized)
+        city = (district.get('city') or '').lower()
+        entries.append((district, district_normalized, city, matcher))
+    by_name = defaultdict(list)
+    starts = []
+    offset = 0
+    for i, (_, district_normalized, _, _) in enumerate(entries):
+        by_name[district_normalized].append(i)
+        starts.append(offset)
+        offset += len(district_normalized) + 1
+    corpus = '\n'.join(entry[1] for entry in entries)
+    return entries, dict(by_name), corpus, starts
+
+def _substring_hits(name_normalized: str, index: tuple) -> set:
+    """Indices of districts whose name contains, or is contained in, the given name."""
+    entries, by_name, corpus, starts = index
+    if not name_normalized:
+        return set(range(len(entries)))
+    
+    # District names inside the subdomain: look up each of its substrings
+    hits = set(by_name.get('', ()))
+    n = len(name_normalized)
+    for i in range(n):
+        for j in range(i + 1, n + 1):
+            hits.update(by_name.get(name_normalized[i:j], ()))
+    
+    # Subdomain inside district names: one scan over the joined corpus
+    pos = corpus.find(name_normalized)
+    while pos != -1:
+        hits.add(bisect_right(starts, pos) - 1)
+        pos = corpus.find(name_normalized, pos + 1)
+    return hits
+
+def _best_match(subdomain: str, index: tuple) -> dict | None:
+    """Score one subdomain against the indexed districts."""
     # Clean subdomain (remove .typingclub.com)
     name = subdomain.replace('.typingclub.com', '')
     name_normalized = normalize_name(name.replace('-', ' '))
+    substring_hits = _substring_hits(name_normalized, index)
     
-    best_match = None
-    best_score = 0.0
+    # Track only the winning entry while scanning; anything must beat 0.5
+    best_district = None
+    best_score = 0.5
     
-    for district in districts:
-        district_name = district['name']
-        district_normalized = normalize_name(district_name)
+    for i, (district, _, city, matcher) in enumerate(index[0]):
+        # Boost if city matches
+        boost = 0.2 if city and city in name_normalized else 0.0
         
         # Direct substring match
-        if name_normalized in district_normalized or district_normalized in name_normalized:
-            score = 0.9
+        if i in substring_hits:
+            score = 0.9 + boost
         else:
-            score = similarity(name_normalized, district_normalized)
-        
-        # Boost if city matches
-        city = (district.get('city') or '').lower()
-        if city and city in name_normalized:
-            score += 0.2
+            # ratio() never exceeds these cheap upper bounds, so skip pairs
+            # that couldn't beat the current best anyway
+            matcher.set_seq1(name_normalized)
+            if (matcher.real_quick_ratio() + boost <= best_score
+                    or matcher.quick_ratio() + boost <= best_score):
+                continue
+            score = matcher.ratio() + boost
             
-        if score > best_score and score > 0.5:
+        if score > best_score:
             best_score = score
-            best_match = {
-                'district': district['name'],
-                'state': district['state'],
-                'enrollment': district.get('enrollment', 0),
-                'confidence': round(score, 2)
-            }
+            best_district = district
     
-    return best_match
+    if best_district is None:
+        return None
+    return {
+        'district': best_district['name'],
+        'state': best_district['state'],
+        'enrollment': best_district.get('enrollment', 0),
+        'confidence': round(best_score, 2)
+    }
 
 def main():
     # Load EdClub subdomains
@@ -80,8 +177,8 @@ def main():
     competitors = []
     matched_districts = set()
     
-    for subdomain in subdomains:
-        match = match_subdomain_to_district(subdomain, districts)
+    matches = match_all_subdomains(subdomains, districts)
+    for subdomain, match in zip(subdomains, matches):
         entry = {
             'subdomain': subdomain,
             'name': subdomain.replace('.typingclub.com', '').replace('-', ' ').title(),
@@ -118,17 +215,19 @@ def main():
     }
     
     with open(DATA_DIR / "edclub_enriched.json", 'w') as f:
-        json.dump(output, f, indent=2)
+        f.write(json.dumps(output, indent=2))
     
-    # Update districts with competitor flag
+    # Update districts with competitor flag, keeping every other top-level
+    # key (e.g. fetch_data's "programs" table) as it was
     districts_output = {
-        'meta': data.get('meta', {}),
+        **(data if isinstance(data, dict) else {}),
+        'meta': data.get('meta', {}) if isinstance(data, dict) else {},
         'districts': districts
     }
     districts_output['meta']['edclub_enrichment'] = True
     
     with open(DATA_DIR / "districts.json", 'w') as f:
-        json.dump(districts_output, f, indent=2)
+        f.write(json.dumps(districts_output, indent=2))
     
     print(f"\nSaved: data/edclub_enriched.json")
     print(f"Updated: data/districts.json (added uses_edclub flag)")
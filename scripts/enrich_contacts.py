@@ -4,18 +4,44 @@ Enrich district data with superintendent names from Ballotpedia
 and email patterns from district websites.
 """
 
+import atexit
 import json
+import os
 import re
+import shutil
+import threading
 import time
-import requests
-from bs4 import BeautifulSoup
+import requests_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from lxml import html
 from pathlib import Path
-from urllib.parse import quote
+from requests import Request
+from requests.adapters import HTTPAdapter
+from urllib.parse import quote, urlparse
+from urllib3.util.retry import Retry
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 }
 
+# One pooled keep-alive session shared by all lookup workers. Responses
+# (including 404s for missing Ballotpedia pages) are cached on disk for a
+# week so re-runs after a crash don't re-scrape everything.
+SESSION = requests_cache.CachedSession(
+    Path(__file__).resolve().parent.parent / '.http_cache',
+    expire_after=7 * 24 * 3600,
+    allowable_codes=(200, 404),
+)
+SESSION.headers.update(HEADERS)
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+)
+SESSION.mount('https://', _adapter)
+SESSION.mount('http://', _adapter)
+
 STATE_NAMES = {
     'WA': 'Washington',
     'OR': 'Oregon', 
@@ -25,18 +51,71 @@ STATE_NAMES = {
     'NY': 'New_York'
 }
 
+# Every lookup goes to ballotpedia.org, so districts still start at most
+# one per REQUEST_INTERVAL, as with the old loop's 1.5s sleep per
+# district. The workers only overlap one district's requests with the
+# next one's wait, so a district costs 1.5s rather than 1.5s plus its
+# response times, and districts already in the HTTP cache don't wait.
+CONCURRENCY = 8
+REQUEST_INTERVAL = 1.5  # seconds between districts (or URLs) on one host
+SAVE_INTERVAL = 30  # seconds between progress saves
+
+# Value cell of any infobox row whose label mentions the superintendent
+SUPERINTENDENT_CELL_XPATH = (
+    "(//table[contains(concat(' ', normalize-space(@class), ' '), ' infobox ')])[1]"
+    "//tr[*[self::th or self::td][1]"
+    "[contains(translate(., 'SUPERINTENDENT', 'superintendent'), 'superintendent')]]"
+    "/*[self::th or self::td][2]"
+)
+
+_DOMAIN_RE = re.compile(r'https?://(?:www\.)?([^/]+)')
+
+_throttle_lock = threading.Lock()
+_next_request_at = {}  # host -> earliest start of its next request
+
 def load_districts():
     """Load current district data."""
     with open('data/districts.json') as f:
         return json.load(f)
 
 def save_districts(data):
-    """Save district data."""
-    with open('data/districts.json', 'w') as f:
-        json.dump(data, f, indent=2)
-    # Also update docs
-    with open('docs/data.json', 'w') as f:
-        json.dump(data, f, indent=2)
+    """Save district data.
+
+    Each file is written to a temp path and renamed into place, so an
+    interrupted save never leaves a truncated districts.json behind.
+    """
+    with open('data/districts.json.tmp', 'w') as f:
+        f.write(json.dumps(data, indent=2))
+    os.replace('data/districts.json.tmp', 'data/districts.json')
+    # Also update docs (same bytes, so copy rather than re-encode)
+    shutil.copyfile('data/districts.json', 'docs/data.json.tmp')
+    os.replace('docs/data.json.tmp', 'docs/data.json')
+
+def is_fresh(url):
+    """
+    Whether a GET of url will be answered from the HTTP cache. Expired
+    entries don't count: they are revalidated with a real request.
+    """
+    cached = SESSION.cache.get_response(SESSION.cache.create_key(Request('GET', url)))
+    return cached is not None and not cached.is_expired
+
+def polite_wait(*urls):
+    """
+    Block until the calling worker may request urls, which share a host
+    and one REQUEST_INTERVAL slot (e.g. the URL variants tried for one
+    district). Each host is throttled on its own, and nothing waits if
+    every URL is already in the HTTP cache.
+    """
+    if all(is_fresh(url) for url in urls):
+        return
+    host = urlparse(urls[0]).netloc
+    with _throttle_lock:
+        now = time.monotonic()
+        next_at = _next_request_at.get(host, now)
+        wait = next_at - now
+        _next_request_at[host] = max(now, next_at) + REQUEST_INTERVAL
+    if wait > 0:
+        time.sleep(wait)
 
 def get_ballotpedia_superintendent(district_name, state):
     """
@@ -55,28 +134,23 @@ def get_ballotpedia_superintendent(district_name, state):
         f"https://ballotpedia.org/{bp_name.replace('_School_District', '')}_School_District,_{state_name}",
     ]
     
+    polite_wait(*urls_to_try)
     for url in urls_to_try:
         try:
-            resp = requests.get(url, headers=HEADERS, timeout=15)
+            resp = SESSION.get(url, timeout=15)
             if resp.ok and 'does not have' not in resp.text:
-                soup = BeautifulSoup(resp.text, 'html.parser')
+                doc = html.fromstring(resp.content)
                 
                 # Look for superintendent in infobox
-                infobox = soup.find('table', class_='infobox')
-                if infobox:
-                    for row in infobox.find_all('tr'):
-                        cells = row.find_all(['th', 'td'])
-                        if len(cells) >= 2:
-                            label = cells[0].get_text().strip().lower()
-                            if 'superintendent' in label:
-                                name = cells[1].get_text().strip()
-                                # Clean up the name
-                                name = re.sub(r'\[.*?\]', '', name).strip()
-                                if name and len(name) > 2:
-                                    return name
+                for cell in doc.xpath(SUPERINTENDENT_CELL_XPATH):
+                    name = cell.text_content().strip()
+                    # Clean up the name
+                    name = re.sub(r'\[.*?\]', '', name).strip()
+                    if name and len(name) > 2:
+                        return name
                 
                 # Also check page text
-                text = soup.get_text()
+                text = doc.text_content()
                 match = re.search(r'superintendent[:\s]+([A-Z][a-z]+(?:\s+[A-Z]\.?)?\s+[A-Z][a-z]+)', text, re.IGNORECASE)
                 if match:
                     return match.group(1)
@@ -86,30 +160,31 @@ def get_ballotpedia_superintendent(district_name, state):
     
     return None
 
+@lru_cache(maxsize=10000)
 def guess_email(name, domain):
     """
     Guess email based on common patterns.
-    Returns list of possible emails to try.
+    Returns a tuple of possible emails to try (cached per name/domain).
     """
     if not name or not domain:
-        return []
+        return ()
     
     parts = name.lower().split()
     if len(parts) < 2:
-        return []
+        return ()
     
     first = parts[0].replace('.', '')
     last = parts[-1]
     first_initial = first[0] if first else ''
     
-    patterns = [
+    patterns = (
         f"{first}.{last}@{domain}",
         f"{first_initial}{last}@{domain}",
         f"{first}{last}@{domain}",
         f"{first}_{last}@{domain}",
         f"{last}.{first}@{domain}",
         f"superintendent@{domain}",
-    ]
+    )
     
     return patterns
 
@@ -117,7 +192,7 @@ def extract_domain(website):
     """Extract domain from website URL for email guessing."""
     if not website:
         return None
-    match = re.search(r'https?://(?:www\.)?([^/]+)', website)
+    match = _DOMAIN_RE.search(website)
     if match:
         domain = match.group(1)
         # Convert web domain to email domain (common patterns)
@@ -149,7 +224,8 @@ def get_email_pattern_from_website(website):
     for path in paths:
         url = website.rstrip('/') + path
         try:
-            resp = requests.get(url, headers=HEADERS, timeout=10)
+            polite_wait(url)
+            resp = SESSION.get(url, timeout=10)
             if resp.ok:
                 # Look for email addresses
                 emails = re.findall(r'[\w.+-]+@[\w-]+\.[\w.-]+', resp.text)
@@ -174,10 +250,10 @@ def main():
     districts = data['districts']
     
     updated = 0
+    to_lookup = []
     
     for i, district in enumerate(districts):
         name = district['name']
-        state = district['state']
         
         # Skip if already has superintendent contact
         existing_contacts = district.get('contacts', [])
@@ -187,54 +263,74 @@ def main():
             print(f"[{i+1}/{len(districts)}] {name}: Already has superintendent")
             continue
         
-        print(f"[{i+1}/{len(districts)}] {name} ({state})...", end=' ', flush=True)
-        
-        # Get superintendent from Ballotpedia
-        supt_name = get_ballotpedia_superintendent(name, state)
+        to_lookup.append(district)
+    
+    print(f"\nLooking up {len(to_lookup)} superintendents ({CONCURRENCY} at a time)...")
+    
+    # Whatever happens from here on, keep the lookups already applied
+    atexit.register(save_districts, data)
+    last_save = time.monotonic()
+    
+    pool = ThreadPoolExecutor(max_workers=CONCURRENCY)
+    try:
+        # Get superintendents from Ballotpedia
+        futures = {
+            pool.submit(get_ballotpedia_superintendent, d['name'], d['state']): d
+            for d in to_lookup
+        }
         
-        if supt_name:
-            print(f"Found: {supt_name}", end=' ')
+        # Results are applied here on the main thread, so no locking is needed
+        for done, future in enumerate(as_completed(futures), 1):
+            district = futures[future]
+            supt_name = future.result()
             
-            # Try to get email pattern
-            website = district.get('website')
-            domain = extract_domain(website)
+            print(f"[{done}/{len(to_lookup)}] {district['name']} ({district['state']})...", end=' ', flush=True)
             
-            if domain:
-                # Generate likely email
-                emails = guess_email(supt_name, domain)
-                likely_email = emails[0] if emails else None
+            if supt_name:
+                print(f"Found: {supt_name}", end=' ')
+                
+                # Try to get email pattern
+                website = district.get('website')
+                domain = extract_domain(website)
+                
+                if domain:
+                    # Generate likely email
+                    emails = guess_email(supt_name, domain)
+                    likely_email = emails[0] if emails else None
+                else:
+                    likely_email = None
+                
+                # Add contact
+                contact = {
+                    'name': supt_name,
+                    'title': 'Superintendent',
+                    'email': likely_email,
+                    'email_guessed': True,
+                    'phone': None,
+                    'source': 'Ballotpedia'
+                }
+                
+                if 'contacts' not in district:
+                    district['contacts'] = []
+                
+                district['contacts'].insert(0, contact)
+                updated += 1
+                print(f"(email: {likely_email})")
             else:
-                likely_email = None
-            
-            # Add contact
-            contact = {
-                'name': supt_name,
-                'title': 'Superintendent',
-                'email': likely_email,
-                'email_guessed': True,
-                'phone': None,
-                'source': 'Ballotpedia'
-            }
+                print("Not found")
             
-            if 'contacts' not in district:
-                district['contacts'] = []
-            
-            district['contacts'].insert(0, contact)
-            updated += 1
-            print(f"(email: {likely_email})")
-        else:
-            print("Not found")
-        
-        # Be polite
-        time.sleep(1.5)
-        
-        # Save progress every 10
-        if (i + 1) % 10 == 0:
-            save_districts(data)
-            print(f"  [Saved progress: {updated} updated]")
+            # Save progress at most every SAVE_INTERVAL seconds
+            if time.monotonic() - last_save > SAVE_INTERVAL:
+                save_districts(data)
+                last_save = time.monotonic()
+                print(f"  [Saved progress: {updated} updated]")
+    finally:
+        # On Ctrl-C or a crash, drop queued lookups instead of running them all
+        pool.shutdown(cancel_futures=True)
     
     # Final save
     save_districts(data)
+    atexit.unregister(save_districts)
     
     print("\n" + "=" * 60)
     print(f"Done! Updated {updated} districts with superintendent info")
@@ -4,47 +4,168 @@ Fetch ALL federal awards (not just education CFDA codes).
 """
 
 import json
+import re
+import shutil
 import time
-import requests
+import requests_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from pathlib import Path
 
 HEADERS = {'Content-Type': 'application/json'}
+AWARDS_URL = "https://api.usaspending.gov/api/v2/search/spending_by_award/"
+
+# Reuse one keep-alive connection to the API; the search POST is
+# read-only, so it is safe to retry and to cache on disk for a week
+SESSION = requests_cache.CachedSession(
+    Path(__file__).resolve().parent.parent / '.http_cache',
+    expire_after=7 * 24 * 3600,
+    allowable_methods=('GET', 'POST'),
+)
+SESSION.headers.update(HEADERS)
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=None,
+    ),
+))
+
+# recipient_search_text takes a list, so districts are searched in batches
+BATCH_SIZE = 20     # search terms per request
+PAGE_LIMIT = 100    # API maximum page size
+PER_TERM = 50       # largest awards kept per search term
+MAX_PAGES = 20      # safety cap per batch
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
 
 def load_districts():
     with open('data/districts.json') as f:
         return json.load(f)
 
 def save_districts(data):
+    # Encode once in one shot, then copy the file for the docs UI
     with open('data/districts.json', 'w') as f:
-        json.dump(data, f, indent=2)
-    with open('docs/data.json', 'w') as f:
-        json.dump(data, f, indent=2)
+        f.write(json.dumps(data, indent=2))
+    shutil.copyfile('data/districts.json', 'docs/data.json')
 
-def search_awards(recipient_name):
-    """Search for ALL awards to a recipient (2023-2026)."""
-    url = "https://api.usaspending.gov/api/v2/search/spending_by_award/"
-    
-    payload = {
+def award_payload(search_terms, limit):
+    return {
         "filters": {
-            "recipient_search_text": [recipient_name],
+            "recipient_search_text": list(search_terms),
             "time_period": [{"start_date": "2023-01-01", "end_date": "2026-12-31"}],
             "award_type_codes": ["02", "03", "04", "05"],  # All grants
         },
-        "fields": ["Award ID", "Recipient Name", "Award Amount", "Description", "Start Date", "CFDA Number"],
+        # Only the fields main() reads, so the response stays small
+        "fields": ["Recipient Name", "Award Amount", "Description", "Start Date", "CFDA Number"],
         "page": 1,
-        "limit": 50,
+        "limit": limit,
         "sort": "Award Amount",
         "order": "desc"
     }
-    
+
+def name_tokens(name):
+    return frozenset(_TOKEN_RE.findall(name.lower()))
+
+def first_token(name):
+    tokens = _TOKEN_RE.findall(name.lower())
+    return tokens[0] if tokens else None
+
+def search_term_awards(search_term):
+    """
+    Search for the largest awards (2023-2026) to one recipient.
+    The API's keyword match is loose, so only awards whose recipient
+    name contains the term's first word are kept.
+    """
+    first = first_token(search_term)
+    if first is None:
+        return []
     try:
-        resp = requests.post(url, json=payload, headers=HEADERS, timeout=30)
+        resp = SESSION.post(AWARDS_URL, json=award_payload([search_term], PER_TERM), timeout=30)
         if resp.ok:
-            return resp.json().get('results', [])
+            return [
+                r for r in resp.json().get('results', [])
+                if first in name_tokens(r.get('Recipient Name') or '')
+            ]
     except Exception as e:
         print(f"    Error: {e}")
     
     return []
 
+def search_awards(search_terms):
+    """
+    Search for ALL awards (2023-2026) to any of several recipients.
+    Returns {search_term: awards}, each list holding that term's
+    largest awards (at most PER_TERM).
+    
+    Awards are assigned to every term whose name tokens all appear in
+    the recipient name, in any order. The API matches more loosely than
+    that (e.g. "SEATTLE SCHOOL DIST. #1" for "Seattle School District"),
+    so a hit that fits no term is searched again under the terms it could
+    belong to: those whose first word it contains and that were still
+    short of PER_TERM at that point. So is any term left short if paging
+    stopped early (MAX_PAGES, or an error). A re-searched term ends up
+    with the same awards as search_term_awards(); if that search fails
+    the batch hits are kept.
+    """
+    payload = award_payload(search_terms, PAGE_LIMIT)
+    by_term = {term: [] for term in search_terms}
+    # A term without any letters or digits would match every recipient
+    term_tokens = [
+        (term, tokens, first_token(term))
+        for term, tokens in ((term, name_tokens(term)) for term in by_term)
+        if tokens
+    ]
+    retry = set()
+    truncated = True
+    
+    for page in range(1, MAX_PAGES + 1):
+        payload["page"] = page
+        try:
+            resp = SESSION.post(AWARDS_URL, json=payload, timeout=30)
+            if not resp.ok:
+                break
+            data = resp.json()
+        except Exception as e:
+            print(f"    Error: {e}")
+            break
+        
+        # Results come largest first, so the first PER_TERM hits for a
+        # term are its top awards
+        for r in data.get('results', []):
+            recipient = name_tokens(r.get('Recipient Name') or '')
+            owners = [term for term, tokens, _ in term_tokens if tokens <= recipient]
+            if not owners:
+                retry.update(
+                    term for term, _, first in term_tokens
+                    if first in recipient and len(by_term[term]) < PER_TERM
+                )
+            for term in owners:
+                if len(by_term[term]) < PER_TERM:
+                    by_term[term].append(r)
+        
+        if not data.get('page_metadata', {}).get('hasNext'):
+            truncated = False
+            break
+        if all(len(awards) >= PER_TERM for awards in by_term.values()):
+            break
+        time.sleep(0.5)
+    
+    if truncated:
+        retry.update(term for term, _, _ in term_tokens if len(by_term[term]) < PER_TERM)
+    
+    for term in by_term:
+        if term in retry:
+            time.sleep(0.5)
+            awards = search_term_awards(term)
+            if awards:
+                by_term[term] = awards
+    
+    return by_term
+
 def main():
     print("=" * 60)
     print("Fetching ALL federal awards (2023-2026)")
@@ -56,20 +177,25 @@ def main():
     large_districts = [d for d in data['districts'] if (d.get('enrollment') or 0) >= 50000]
     print(f"\nUpdating {len(large_districts)} large districts...")
     
-    for i, district in enumerate(large_districts):
-        name = district['name']
-        
-        # Simplify search term
-        search_term = name.replace(' School District', '').replace(' Public Schools', '').replace(' County', '')
-        
-        print(f"\n[{i+1}/{len(large_districts)}] {name}")
-        print(f"  Searching: {search_term}")
-        
-        results = search_awards(search_term)
+    # Simplify search terms
+    search_terms = [
+        (d, d['name'].replace(' School District', '').replace(' Public Schools', '').replace(' County', ''))
+        for d in large_districts
+    ]
+    
+    for batch_start in range(0, len(search_terms), BATCH_SIZE):
+        batch = search_terms[batch_start:batch_start + BATCH_SIZE]
+        print(f"\nSearching {len(batch)} districts in one batch...")
+        results_by_term = search_awards([term for _, term in batch])
         
-        if results:
-            # Filter to actual matches
-            matching = [r for r in results if search_term.lower().split()[0] in (r.get('Recipient Name') or '').lower()]
+        for i, (district, search_term) in enumerate(batch, batch_start):
+            name = district['name']
+            
+            print(f"\n[{i+1}/{len(large_districts)}] {name}")
+            print(f"  Searching: {search_term}")
+            
+            # search_awards already kept only this district's awards
+            matching = results_by_term.get(search_term)
             
             if matching:
                 total = sum(r.get('Award Amount') or 0 for r in matching)
@@ -89,8 +215,6 @@ def main():
                 print(f"  ✓ {len(matching)} awards, ${total:,.0f}")
             else:
                 print(f"  No matching awards")
-        else:
-            print(f"  No results")
         
         time.sleep(0.5)
     
@@ -6,16 +6,53 @@ Fetch school district data from public sources.
 """
 
 import json
-import requests
+import re
+import shutil
+import requests_cache
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 DATA_DIR = Path(__file__).parent.parent / "data"
 DOCS_DIR = Path(__file__).parent.parent / "docs"
 
+# One keep-alive session for every USASpending call. The search POSTs
+# are read-only, so they are safe to retry, and responses are cached on
+# disk for a week so re-runs don't hit the API again.
+SESSION = requests_cache.CachedSession(
+    Path(__file__).resolve().parent.parent / '.http_cache',
+    expire_after=7 * 24 * 3600,
+    allowable_methods=('GET', 'POST'),
+)
+SESSION.headers.update({'Content-Type': 'application/json', 'User-Agent': 'tc-prospects/1.0'})
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=20,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=None,
+    ),
+))
+
 # States to fetch (expand as needed)
 STATES = ["WA", "OR", "CA", "TX", "FL", "NY"]
 
+# Award years to fetch per state, and how many fetches run at once
+YEARS = ["2024", "2025", "2026"]
+FETCH_WORKERS = 8
+
+# Years whose awards count towards a district's "recent_awards"
+RECENT_YEARS = frozenset(["2025", "2026"])
+
+# Results are paged; 100 is the largest page the API accepts
+PAGE_LIMIT = 100
+MAX_PAGES = 50      # safety cap per state-year
+
 # CFDA program codes for education grants
 CFDA_PROGRAMS = {
     "84.010": "Title I - Improving Basic Programs",
@@ -34,76 +71,128 @@ CFDA_PROGRAMS = {
 }
 
 
-def fetch_usaspending_detailed(state: str, years: list = None) -> list:
-    """Fetch Department of Education awards with full details."""
-    if years is None:
-        years = ["2024", "2025", "2026"]
+def fetch_usaspending_detailed(state: str, year: str) -> list:
+    """Fetch one state-year of Department of Education awards to school districts."""
+    url = "https://api.usaspending.gov/api/v2/search/spending_by_award/"
     
-    all_awards = []
+    # Queries stay one state per request: the response rows don't carry a
+    # reliable recipient state to split a multi-state page on, and the
+    # state-years already run concurrently. There's no program_numbers
+    # filter either, since totals include every Department of Education
+    # grant (e.g. ESSER), not just the codes named in CFDA_PROGRAMS.
+    payload = {
+        "filters": {
+            "time_period": [{"start_date": f"{year}-01-01", "end_date": f"{year}-12-31"}],
+            "agencies": [{"type": "awarding", "tier": "toptier", "name": "Department of Education"}],
+            "recipient_locations": [{"country": "USA", "state": state}],
+            "award_type_codes": ["02", "03", "04", "05"]  # Grants
+        },
+        # Only the fields build_district_database reads, so pages stay small
+        "fields": [
+            "Recipient Name", 
+            "Award Amount", 
+            "Description",
+            "Start Date",
+            "CFDA Number"
+        ],
+        "limit": PAGE_LIMIT,
+        "page": 1,
+        "sort": "Award Amount",
+        "order": "desc"
+    }
     
-    for year in years:
-        url = "https://api.usaspending.gov/api/v2/search/spending_by_award/"
-        
-        payload = {
-            "filters": {
-                "time_period": [{"start_date": f"{year}-01-01", "end_date": f"{year}-12-31"}],
-                "agencies": [{"type": "awarding", "tier": "toptier", "name": "Department of Education"}],
-                "recipient_locations": [{"country": "USA", "state": state}],
-                "award_type_codes": ["02", "03", "04", "05"]  # Grants
-            },
-            "fields": [
-                "Award ID", 
-                "Recipient Name", 
-                "Award Amount", 
-                "Description",
-                "Start Date",
-                "End Date",
-                "Awarding Agency",
-                "CFDA Number"
-            ],
-            "limit": 100,
-            "page": 1,
-            "sort": "Award Amount",
-            "order": "desc"
-        }
-        
+    # Follow hasNext so large states aren't cut off at the first page
+    results = []
+    for page in range(1, MAX_PAGES + 1):
+        payload["page"] = page
         try:
-            resp = requests.post(url, json=payload, timeout=30)
+            resp = SESSION.post(url, json=payload, timeout=30)
             resp.raise_for_status()
             data = resp.json()
-            results = data.get("results", [])
-            for r in results:
-                r["fetch_year"] = year
-            all_awards.extend(results)
         except Exception as e:
-            print(f"  Error fetching {state} {year}: {e}")
+            print(f"  Error fetching {state} {year} (page {page}): {e}")
+            break
+        
+        # Keep only school-district recipients, so the rest of each page
+        # isn't held in memory until every state-year has been fetched
+        page_results = data.get("results", [])
+        results.extend(
+            r for r in page_results
+            if is_school_district((r.get("Recipient Name") or "").upper().strip())
+        )
+        if not data.get("page_metadata", {}).get("hasNext") or len(page_results) < PAGE_LIMIT:
+            break
+    
+    for r in results:
+        r["fetch_year"] = year
+    return results
+
+
+def fetch_state_awards(states: list, years: list = None) -> dict:
+    """Fetch every (state, year) concurrently; returns {state: awards in year order}."""
+    if years is None:
+        years = YEARS
+    
+    tasks = [(state, year) for state in states for year in years]
+    # I/O-bound, so threads sharing SESSION overlap the network waits
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        results = pool.map(lambda task: fetch_usaspending_detailed(*task), tasks)
+        
+        awards_by_state = {state: [] for state in states}
+        for (state, _), awards in zip(tasks, results):
+            awards_by_state[state].extend(awards)
     
-    return all_awards
+    return awards_by_state
 
 
-def parse_cfda(cfda_str: str) -> dict:
-    """Parse CFDA number and return program info."""
+@lru_cache(maxsize=8192)
+def parse_cfda(cfda_str: str) -> tuple:
+    """Parse CFDA number and return (code, program, is_title_i)."""
     if not cfda_str:
-        return {"code": None, "program": "Unknown"}
+        return None, "Unknown", False
     
     # CFDA format is usually "84.010" or similar
     code = cfda_str.split()[0] if cfda_str else None
     program = CFDA_PROGRAMS.get(code, cfda_str)
     
-    return {"code": code, "program": program}
+    # Title I programs are 84.010-84.013
+    return code, program, code.startswith("84.01")
+
 
+# Recipient-name keywords, compiled into one pattern so a name is scanned
+# once for both lists. Excludes come first so they win at a shared offset.
+DISTRICT_KEYWORDS = ["SCHOOL", "DISTRICT", "UNIFIED", "ISD", "USD", "EDUCATION", "LEARNING"]
+DISTRICT_EXCLUDE = ["UNIVERSITY", "COLLEGE", "SUPERINTENDENT OF PUBLIC"]
+_DISTRICT_RE = re.compile(
+    "(?P<exclude>" + "|".join(map(re.escape, DISTRICT_EXCLUDE)) + ")"
+    "|(?P<keyword>" + "|".join(map(re.escape, DISTRICT_KEYWORDS)) + ")"
+)
 
+
+@lru_cache(maxsize=8192)
 def is_school_district(name: str) -> bool:
     """Check if recipient name looks like a school district."""
     if not name:
         return False
-    name_upper = name.upper()
-    keywords = ["SCHOOL", "DISTRICT", "UNIFIED", "ISD", "USD", "EDUCATION", "LEARNING"]
-    exclude = ["UNIVERSITY", "COLLEGE", "SUPERINTENDENT OF PUBLIC"]
     
-    if any(ex in name_upper for ex in exclude):
-        return False
-    return any(kw in name_upper for kw in keywords)
+    found = False
+    for match in _DISTRICT_RE.finditer(name.upper()):
+        if match.lastgroup == "exclude":
+            return False
+        found = True
+    return found
+
+
+# Generic words dropped when matching district names, so "Seattle Public
+# Schools" and "SEATTLE SCHOOL DISTRICT" compare equal
+_NAME_STOPWORDS = frozenset(["PUBLIC", "SCHOOL", "SCHOOLS", "DISTRICT"])
+_NON_ALNUM_RE = re.compile(r"[^A-Z0-9]+")
+
+
+def normalize_district_name(name: str) -> str:
+    """Upper-case, strip punctuation and drop generic district words."""
+    tokens = _NON_ALNUM_RE.sub(" ", name.upper()).split()
+    return " ".join(t for t in tokens if t not in _NAME_STOPWORDS)
 
 
 def build_district_database(states: list) -> dict:
@@ -117,29 +206,33 @@ def build_district_database(states: list) -> dict:
             "sources": ["USASpending.gov", "NCES"],
             "states": states
         },
+        "programs": CFDA_PROGRAMS,
         "districts": [],
         "awards_by_district": {}
     }
     
+    # Get detailed federal awards
+    print(f"Fetching {len(states)} states x {len(YEARS)} years concurrently...")
+    awards_by_state = fetch_state_awards(states)
+    
     for state in states:
-        print(f"Fetching {state}...")
+        print(f"Processing {state}...")
         
-        # Get detailed federal awards
-        awards = fetch_usaspending_detailed(state)
-        print(f"  Found {len(awards)} total awards")
+        awards = awards_by_state[state]
+        print(f"  Found {len(awards)} school district awards")
         
         # Group by district
         district_awards = {}
         for award in awards:
-            name = award.get("Recipient Name", "")
-            if not is_school_district(name):
-                continue
+            # Non-district recipients were already dropped while fetching
+            name = award["Recipient Name"]
             
             # Normalize district name
             district_key = name.upper().strip()
             
-            if district_key not in district_awards:
-                district_awards[district_key] = {
+            district = district_awards.get(district_key)
+            if district is None:
+                district = district_awards[district_key] = {
                     "name": name,
                     "state": state,
                     "awards": [],
@@ -148,29 +241,33 @@ def build_district_database(states: list) -> dict:
                     "recent_awards": 0  # Awards in last 12 months
                 }
             
-            cfda_info = parse_cfda(award.get("CFDA Number"))
+            cfda_code, program, is_title_i = parse_cfda(award.get("CFDA Number"))
             amount = award.get("Award Amount") or 0
             start_date = award.get("Start Date", "")
+            year = award.get("fetch_year")
             
             award_record = {
                 "amount": amount,
                 "description": (award.get("Description") or "")[:200],
-                "cfda_code": cfda_info["code"],
-                "program": cfda_info["program"],
+                "cfda_code": cfda_code,
                 "start_date": start_date,
-                "year": award.get("fetch_year")
+                "year": year
             }
+            # Known programs are named once in the top-level "programs"
+            # table; only spell out the ones it doesn't cover
+            if cfda_code not in CFDA_PROGRAMS:
+                award_record["program"] = program
             
-            district_awards[district_key]["awards"].append(award_record)
-            district_awards[district_key]["total_amount"] += amount
+            district["awards"].append(award_record)
+            district["total_amount"] += amount
             
             # Track Title I specifically
-            if cfda_info["code"] and cfda_info["code"].startswith("84.01"):
-                district_awards[district_key]["title_i_amount"] += amount
+            if is_title_i:
+                district["title_i_amount"] += amount
             
             # Track recent awards (2025-2026)
-            if award.get("fetch_year") in ["2025", "2026"]:
-                district_awards[district_key]["recent_awards"] += 1
+            if year in RECENT_YEARS:
+                district["recent_awards"] += 1
         
         all_data["awards_by_district"][state] = district_awards
         print(f"  {len(district_awards)} school districts found")
@@ -203,19 +300,36 @@ def add_sample_districts(data: dict) -> dict:
         {"name": "Orange County Public Schools", "state": "FL", "enrollment": 206000, "city": "Orlando", "type": "Urban"},
     ]
     
-    # Merge with award data
+    # Index each state's awards by normalized name once, keeping the
+    # first (largest-award) recipient when several normalize alike
+    normalized_awards = {}
+    for state, state_awards in data["awards_by_district"].items():
+        index = normalized_awards[state] = {}
+        for key, award_data in state_awards.items():
+            normalized = normalize_district_name(key)
+            if normalized:
+                index.setdefault(normalized, award_data)
+    
+    # Merge with award data, remembering which award records got used
+    merged = set()
     for district in sample_districts:
         state_awards = data["awards_by_district"].get(district["state"], {})
         
-        # Try to match by name
-        matched = None
+        # Try to match by name: an exact or normalized hit is a dict
+        # lookup; only fall back to a substring scan on a miss
         district_name_upper = district["name"].upper()
-        for key, award_data in state_awards.items():
-            if district_name_upper in key or key in district_name_upper:
-                matched = award_data
-                break
+        matched = state_awards.get(district_name_upper)
+        if matched is None:
+            normalized = normalize_district_name(district_name_upper)
+            matched = normalized_awards.get(district["state"], {}).get(normalized) if normalized else None
+        if matched is None:
+            for key, award_data in state_awards.items():
+                if district_name_upper in key or key in district_name_upper:
+                    matched = award_data
+                    break
         
         if matched:
+            merged.add(id(matched))
             district["federal_awards"] = matched["total_amount"]
             district["title_i"] = matched["title_i_amount"]
             district["recent_awards"] = matched["recent_awards"]
@@ -226,26 +340,38 @@ def add_sample_districts(data: dict) -> dict:
             district["recent_awards"] = 0
             district["award_details"] = []
     
-    # Also add districts we found in USASpending that aren't in our sample
+    # Also add districts we found in USASpending that aren't in our sample.
+    # A recipient counts as already present if it was merged above, its
+    # normalized name matches a district we have in that state, or its name
+    # contains (or is contained in) one of that state's listed names, e.g.
+    # "X SCHOOL DISTRICT FOUNDATION" next to "X School District".
+    seen = {(d["state"], normalize_district_name(d["name"]) or d["name"].upper()) for d in sample_districts}
+    names_upper = {}
+    for d in sample_districts:
+        names_upper.setdefault(d["state"], []).append(d["name"].upper())
     for state, state_awards in data["awards_by_district"].items():
+        state_names = names_upper.setdefault(state, [])
         for key, award_data in state_awards.items():
-            # Check if already in sample
-            exists = any(
-                d["name"].upper() in key or key in d["name"].upper() 
-                for d in sample_districts
-            )
-            if not exists and award_data["total_amount"] > 1000000:  # Only add if >$1M
-                sample_districts.append({
-                    "name": award_data["name"],
-                    "state": state,
-                    "enrollment": None,  # Unknown
-                    "city": None,
-                    "type": None,
-                    "federal_awards": award_data["total_amount"],
-                    "title_i": award_data["title_i_amount"],
-                    "recent_awards": award_data["recent_awards"],
-                    "award_details": award_data["awards"][:10]
-                })
+            if id(award_data) in merged or award_data["total_amount"] <= 1000000:  # Only add if >$1M
+                continue
+            name_key = (state, normalize_district_name(key) or key)
+            if name_key in seen:
+                continue
+            if any(name_upper in key or key in name_upper for name_upper in state_names):
+                continue
+            seen.add(name_key)
+            state_names.append(award_data["name"].upper())
+            sample_districts.append({
+                "name": award_data["name"],
+                "state": state,
+                "enrollment": None,  # Unknown
+                "city": None,
+                "type": None,
+                "federal_awards": award_data["total_amount"],
+                "title_i": award_data["title_i_amount"],
+                "recent_awards": award_data["recent_awards"],
+                "award_details": award_data["awards"][:10]
+            })
     
     data["districts"] = sample_districts
     return data
@@ -256,22 +382,21 @@ def main():
     DOCS_DIR.mkdir(exist_ok=True)
     
     # Build database
-    data = build_district_database(STATES)
+    with SESSION:
+        data = build_district_database(STATES)
     data = add_sample_districts(data)
     
     # Remove raw awards_by_district to keep file smaller
     del data["awards_by_district"]
     
-    # Save to data dir
+    # Save to data dir, encoding once in one shot
     output_path = DATA_DIR / "districts.json"
-    with open(output_path, "w") as f:
-        json.dump(data, f, indent=2)
+    output_path.write_text(json.dumps(data, indent=2))
     print(f"\nSaved to {output_path}")
     
     # Copy to docs for web UI
     docs_path = DOCS_DIR / "data.json"
-    with open(docs_path, "w") as f:
-        json.dump(data, f, indent=2)
+    shutil.copyfile(output_path, docs_path)
     print(f"Copied to {docs_path}")
     
     # Summary
@@ -4,21 +4,49 @@ Fetch RECENT federal awards (2024-2025) from USASpending API.
 """
 
 import json
-import time
-import requests
+import re
+import shutil
+import requests_cache
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from pathlib import Path
 
-HEADERS = {'Content-Type': 'application/json'}
+HEADERS = {'Content-Type': 'application/json', 'User-Agent': 'tc-prospects/1.0'}
+
+# One keep-alive session for every USASpending call. The search POSTs
+# are read-only, so they are safe to retry, and responses are cached on
+# disk for a week so re-runs don't hit the API again.
+SESSION = requests_cache.CachedSession(
+    Path(__file__).resolve().parent.parent / '.http_cache',
+    expire_after=7 * 24 * 3600,
+    allowable_methods=('GET', 'POST'),
+)
+SESSION.headers.update(HEADERS)
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=20,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=None,
+    ),
+))
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
 
 def load_districts():
     with open('data/districts.json') as f:
         return json.load(f)
 
 def save_districts(data):
+    # Encode once in one shot, then copy the file for the docs UI
     with open('data/districts.json', 'w') as f:
-        json.dump(data, f, indent=2)
-    with open('docs/data.json', 'w') as f:
-        json.dump(data, f, indent=2)
+        f.write(json.dumps(data, indent=2))
+    shutil.copyfile('data/districts.json', 'docs/data.json')
 
 def search_recent_awards(recipient_name, state):
     """
@@ -57,7 +85,7 @@ def search_recent_awards(recipient_name, state):
     }
     
     try:
-        resp = requests.post(url, json=payload, headers=HEADERS, timeout=30)
+        resp = SESSION.post(url, json=payload, timeout=30)
         if resp.ok:
             data = resp.json()
             results = data.get('results', [])
@@ -101,7 +129,7 @@ def search_by_cfda(cfda_codes, state):
     }
     
     try:
-        resp = requests.post(url, json=payload, headers=HEADERS, timeout=30)
+        resp = SESSION.post(url, json=payload, timeout=30)
         if resp.ok:
             data = resp.json()
             return data.get('results', [])
@@ -132,10 +160,16 @@ def main():
     print(f"\nSearching for recent education grants in {len(states)} states...")
     
     all_recent = []
+    # Each search is state-scoped, so awards are bucketed by the state they
+    # were found in, with recipient-name tokens computed once per award
+    recent_by_state = defaultdict(list)
     
-    for state in states:
+    # Search every state concurrently; results come back in state order
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results_by_state = list(pool.map(lambda state: search_by_cfda(edu_cfda, state), states))
+    
+    for state, results in zip(states, results_by_state):
         print(f"\n{state}:")
-        results = search_by_cfda(edu_cfda, state)
         
         if results:
             # Filter for school districts
@@ -150,11 +184,14 @@ def main():
                 print(f"      Date: {award.get('Start Date', 'N/A')}")
             
             all_recent.extend(district_awards)
+            recent_by_state[state].extend(
+                (frozenset(_TOKEN_RE.findall((a.get('Recipient Name') or '').lower())), a)
+                for a in district_awards
+            )
         else:
             print(f"  No recent awards found")
-        
-        time.sleep(0.5)
     
+    SESSION.close()
     print(f"\n\nTotal recent awards found: {len(all_recent)}")
     
     # Now update our district data
@@ -163,13 +200,11 @@ def main():
         updated = 0
         
         for district in data['districts']:
-            d_name = district['name'].lower()
-            d_state = district['state']
+            d_words = frozenset(_TOKEN_RE.findall(district['name'].lower())[:2])
             
-            # Find matching awards
-            matching = [a for a in all_recent 
-                if d_state in str(a) and 
-                any(word in (a.get('Recipient Name') or '').lower() for word in d_name.split()[:2])]
+            # Find matching awards: same state, sharing a leading name word
+            matching = [a for tokens, a in recent_by_state.get(district['state'], ())
+                if not d_words.isdisjoint(tokens)]
             
             if matching:
                 # Update award details
@@ -5,12 +5,44 @@ Fix bad superintendent extractions and add tech director contacts.
 
 import json
 import re
+import shutil
 import time
-import requests
-from bs4 import BeautifulSoup
+import requests_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
+from lxml import etree, html
+from requests.adapters import HTTPAdapter
+from pathlib import Path
 
 HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
 
+# Candidate leadership pages, fetched concurrently for each district
+LEADERSHIP_PATHS = ['/about/leadership', '/administration', '/district/leadership', '/about-us', '/contact']
+
+# One keep-alive session, so the page fetches for a district share
+# connections to its host. Pages are cached on disk and revalidated on
+# every run: a page with an ETag/Last-Modified is re-sent as a
+# conditional GET, and a 304 reuses the cached body instead of
+# downloading it again.
+SESSION = requests_cache.CachedSession(
+    Path(__file__).resolve().parent.parent / '.http_cache',
+    expire_after=7 * 24 * 3600,
+    always_revalidate=True,
+)
+SESSION.headers.update(HEADERS)
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=len(LEADERSHIP_PATHS))
+SESSION.mount('https://', _adapter)
+SESSION.mount('http://', _adapter)
+
+# Technology-leader titles, matched as whole words so 'cto' doesn't hit
+# 'director', and a nearby "First [M.] Last" name
+TECH_RE = re.compile(r'chief technology|chief information|director of technology|technology director|\bcto\b|\bcio\b', re.I)
+NAME_RE = re.compile(r'([A-Z][a-z]+(?:\s+[A-Z]\.?)?\s+[A-Z][a-z]+)')
+
+# Contact titles that already cover the tech / curriculum roles
+TECH_TITLE_RE = re.compile(r'technolog|\bcio\b|\bcto\b', re.I)
+CURR_TITLE_RE = re.compile(r'curriculum|academic', re.I)
+
 # Manual fixes for bad extractions (verified from district websites)
 SUPERINTENDENT_FIXES = {
     'Tacoma Public Schools': {
@@ -93,45 +125,54 @@ def load_districts():
         return json.load(f)
 
 def save_districts(data):
+    # Encode once in one shot, then copy the file for the docs UI
     with open('data/districts.json', 'w') as f:
-        json.dump(data, f, indent=2)
-    with open('docs/data.json', 'w') as f:
-        json.dump(data, f, indent=2)
+        f.write(json.dumps(data, indent=2))
+    shutil.copyfile('data/districts.json', 'docs/data.json')
+
+def scrape_tech_contact(url):
+    """Fetch one page and return a tech-leader contact list, or None."""
+    try:
+        resp = SESSION.get(url, timeout=10)
+        if resp.ok:
+            doc = html.fromstring(resp.content)
+            
+            # Look for CTO/CIO/Technology in the text each element owns
+            # directly (its text plus its children's tails), without
+            # building a wrapper object per text node
+            for elem in doc.iter(tag=etree.Element):
+                if any(t and TECH_RE.search(t) for t in chain([elem.text], (c.tail for c in elem))):
+                    text = elem.text_content()
+                    # Try to extract name nearby
+                    name_match = NAME_RE.search(text)
+                    if name_match:
+                        return [{'name': name_match.group(1), 'title': 'Technology Director', 
+                                'source': 'Website scrape'}]
+    except:
+        pass
+    
+    return None
 
 def scrape_district_contacts(district_name, website):
     """Try to scrape contacts from district website."""
     if not website:
         return []
     
-    contacts = []
-    paths = ['/about/leadership', '/administration', '/district/leadership', '/about-us', '/contact']
+    urls = [website.rstrip('/') + path for path in LEADERSHIP_PATHS]
     
-    for path in paths:
-        url = website.rstrip('/') + path
-        try:
-            resp = requests.get(url, headers=HEADERS, timeout=10)
-            if resp.ok:
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                
-                # Look for CTO/CIO/Technology
-                tech_patterns = ['chief technology', 'chief information', 'director of technology', 
-                                'technology director', 'cto', 'cio']
-                
-                for pattern in tech_patterns:
-                    elements = soup.find_all(text=re.compile(pattern, re.I))
-                    for elem in elements:
-                        parent = elem.parent
-                        if parent:
-                            text = parent.get_text()
-                            # Try to extract name nearby
-                            name_match = re.search(r'([A-Z][a-z]+(?:\s+[A-Z]\.?)?\s+[A-Z][a-z]+)', text)
-                            if name_match:
-                                return [{'name': name_match.group(1), 'title': 'Technology Director', 
-                                        'source': 'Website scrape'}]
-        except:
-            pass
+    # Fetch every candidate page at once and take the first that yields a
+    # contact, rather than waiting out up to five timeouts in a row
+    pool = ThreadPoolExecutor(max_workers=len(urls))
+    try:
+        futures = [pool.submit(scrape_tech_contact, url) for url in urls]
+        for future in as_completed(futures):
+            contacts = future.result()
+            if contacts:
+                return contacts
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
     
-    return contacts
+    return []
 
 def main():
     print("=" * 60)
@@ -140,14 +181,23 @@ def main():
     
     data = load_districts()
     
-    # Fix bad superintendent extractions
-    print("\n1. Fixing superintendent extractions...")
+    # One pass over the districts: fix the superintendent, then add any
+    # missing tech and curriculum directors
+    print("\nFixing superintendents and adding tech/curriculum directors...")
     for district in data['districts']:
         name = district['name']
-        if name in SUPERINTENDENT_FIXES:
-            fix = SUPERINTENDENT_FIXES[name]
+        fix = SUPERINTENDENT_FIXES.get(name)
+        td = TECH_DIRECTORS.get(name)
+        cd = CURRICULUM_DIRECTORS.get(name)
+        if not (fix or td or cd):
+            continue
+        
+        contacts = district.get('contacts', [])
+        
+        # Fix bad superintendent extractions
+        if fix:
             # Find and update the bad contact
-            for contact in district.get('contacts', []):
+            for contact in contacts:
                 if contact.get('title') == 'Superintendent':
                     print(f"  Fixing {name}: {contact['name']} -> {fix['name']}")
                     contact['name'] = fix['name']
@@ -155,45 +205,32 @@ def main():
                     contact['email_guessed'] = False
                     contact['source'] = fix['source']
                     break
-    
-    # Add tech directors
-    print("\n2. Adding tech directors...")
-    for district in data['districts']:
-        name = district['name']
-        if name in TECH_DIRECTORS:
-            td = TECH_DIRECTORS[name]
-            # Check if already exists
-            existing = [c for c in district.get('contacts', []) if 'technology' in (c.get('title') or '').lower() or 'cio' in (c.get('title') or '').lower() or 'cto' in (c.get('title') or '').lower()]
-            if not existing:
-                if 'contacts' not in district:
-                    district['contacts'] = []
-                district['contacts'].append({
-                    'name': td['name'],
-                    'title': td['title'],
-                    'email': td['email'],
-                    'email_guessed': False,
-                    'source': 'Manual research'
-                })
-                print(f"  Added {td['name']} ({td['title']}) to {name}")
-    
-    # Add curriculum directors
-    print("\n3. Adding curriculum directors...")
-    for district in data['districts']:
-        name = district['name']
-        if name in CURRICULUM_DIRECTORS:
-            cd = CURRICULUM_DIRECTORS[name]
-            existing = [c for c in district.get('contacts', []) if 'curriculum' in (c.get('title') or '').lower() or 'academic' in (c.get('title') or '').lower()]
-            if not existing:
-                if 'contacts' not in district:
-                    district['contacts'] = []
-                district['contacts'].append({
-                    'name': cd['name'],
-                    'title': cd['title'],
-                    'email': cd['email'],
-                    'email_guessed': False,
-                    'source': 'Manual research'
-                })
-                print(f"  Added {cd['name']} ({cd['title']}) to {name}")
+        
+        # Check both roles before adding either
+        has_tech = any(TECH_TITLE_RE.search(c.get('title') or '') for c in contacts)
+        has_curriculum = any(CURR_TITLE_RE.search(c.get('title') or '') for c in contacts)
+        
+        # Add tech directors
+        if td and not has_tech:
+            district.setdefault('contacts', []).append({
+                'name': td['name'],
+                'title': td['title'],
+                'email': td['email'],
+                'email_guessed': False,
+                'source': 'Manual research'
+            })
+            print(f"  Added {td['name']} ({td['title']}) to {name}")
+        
+        # Add curriculum directors
+        if cd and not has_curriculum:
+            district.setdefault('contacts', []).append({
+                'name': cd['name'],
+                'title': cd['title'],
+                'email': cd['email'],
+                'email_guessed': False,
+                'source': 'Manual research'
+            })
+            print(f"  Added {cd['name']} ({cd['title']}) to {name}")
     
     save_districts(data)
     
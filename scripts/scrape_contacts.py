@@ -6,15 +6,33 @@ Looks for staff directories, admin contacts, tech directors, etc.
 
 import json
 import re
+import shutil
+import threading
 import time
-import requests
+import requests_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
 from pathlib import Path
+from itertools import chain
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
+from lxml import etree, html
 
 DATA_DIR = Path(__file__).parent.parent / "data"
 DOCS_DIR = Path(__file__).parent.parent / "docs"
 
+# Districts are scraped concurrently (each on its own host), while page
+# requests to any one host stay spaced out to be polite
+CONCURRENCY = 8
+PAGE_INTERVAL = 0.5  # seconds between requests to the same host
+
+# Pages larger than this are skipped unread when they declare their size,
+# and otherwise cut off at this many bytes before parsing
+MAX_PAGE_BYTES = 2_000_000
+
+_thread_local = threading.local()
+_throttle_lock = threading.Lock()
+_next_request_at = {}  # host -> earliest start of its next request
+
 # Contact titles we're looking for
 TARGET_TITLES = [
     "superintendent",
@@ -43,8 +61,26 @@ TARGET_TITLES = [
     "coo",
 ]
 
-# Email regex
-EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+# All titles in one case-insensitive pass, longer titles tried first.
+# Abbreviations must be whole words (so "cto" doesn't match inside
+# "director"); full titles match anywhere, since adjacent text nodes
+# often run together ("Jane RoeSuperintendent").
+TITLE_RE = re.compile(
+    '|'.join(
+        rf'\b{re.escape(t)}\b' if len(t) <= 3 else re.escape(t)
+        for t in sorted(TARGET_TITLES, key=len, reverse=True)
+    ),
+    re.I,
+)
+
+# Email regex. The lookbehind only lets a match start at the beginning of
+# a run of address characters, so long runs without an "@" are rejected in
+# linear time instead of being rescanned from every offset.
+EMAIL_PATTERN = re.compile(r'(?<![a-zA-Z0-9._%+-])[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+# Shared mailboxes that don't belong to a person
+GENERIC_EMAIL_PREFIXES = ('info@', 'contact@', 'support@', 'admin@', 'webmaster@',
+                          'noreply@', 'help@', 'office@', 'communications@', 'hr@')
 
 # Phone regex (US format)
 PHONE_PATTERN = re.compile(r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
@@ -52,10 +88,44 @@ PHONE_PATTERN = re.compile(r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
 # Name pattern - looks like "First Last" or "First M. Last"
 NAME_PATTERN = re.compile(r'^[A-Z][a-z]+(?:\s+[A-Z]\.?)?\s+[A-Z][a-zA-Z\-]+(?:\s+[A-Z][a-zA-Z\-]+)?$')
 
+# Non-empty lines of a block's text, scanned lazily for a name
+LINE_RE = re.compile(r'[^\n]+')
+
+# Common words that rule a line out as a person's name
+NON_NAME_WORDS = frozenset([
+    'the', 'our', 'meet', 'contact', 'about', 'office', 'department',
+    'district', 'school', 'public', 'services', 'board', 'click',
+    'view', 'read', 'more', 'home', 'page', 'menu', 'search',
+    'phone', 'email', 'fax', 'address', 'location',
+])
+
+# Nodes whose text isn't visible page content
+INVISIBLE_XPATH = '//script|//style|//comment()'
+
+# Keywords that suggest staff/leadership pages, matched case-insensitively
+# anywhere in a link's href or text in one pass
+STAFF_PAGE_KEYWORDS = ['staff', 'directory', 'leadership', 'administration', 'cabinet', 
+                       'team', 'about', 'contact', 'superintendent', 'board']
+STAFF_PAGE_RE = re.compile('|'.join(map(re.escape, STAFF_PAGE_KEYWORDS)), re.I)
+
+# Block containers searched for the name/title around an email, and the
+# tags inside them that usually hold a person's name
+CONTAINER_TAGS = frozenset(['div', 'li', 'tr', 'td', 'article', 'section', 'p'])
+NAME_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'strong', 'b')
+
 
 def get_session():
-    """Create a requests session with appropriate headers."""
-    session = requests.Session()
+    """Create a requests session with appropriate headers.
+    
+    Pages are cached on disk for a day, so re-runs while iterating on the
+    extraction don't re-crawl every district.
+    """
+    session = requests_cache.CachedSession(
+        Path(__file__).resolve().parent.parent / '.http_cache',
+        expire_after=timedelta(days=1),
+        allowable_codes=(200, 301, 302),
+        filter_fn=is_cacheable_page,
+    )
     session.headers.update({
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -63,49 +133,130 @@ def get_session():
     return session
 
 
+def worker_session():
+    """Return the calling thread's session, creating it on first use."""
+    session = getattr(_thread_local, 'session', None)
+    if session is None:
+        session = _thread_local.session = get_session()
+    return session
+
+
+def polite_wait(session, url):
+    """
+    Block until the calling worker may request url's host again. URLs
+    already in the HTTP cache don't wait.
+    """
+    if session.cache.contains(url=url):
+        return
+    host = urlparse(url).netloc
+    with _throttle_lock:
+        now = time.monotonic()
+        next_at = _next_request_at.get(host, now)
+        wait = next_at - now
+        _next_request_at[host] = max(now, next_at) + PAGE_INTERVAL
+    if wait > 0:
+        time.sleep(wait)
+
+
+def is_html_page(resp):
+    """Check (from headers alone) that resp is an HTML page worth reading."""
+    if 'html' not in resp.headers.get('Content-Type', 'text/html').lower():
+        return False
+    length = resp.headers.get('Content-Length', '')
+    return not (length.isdigit() and int(length) > MAX_PAGE_BYTES)
+
+
+def is_cacheable_page(resp):
+    """
+    Only cache HTML pages that declare their length. The cache copies the
+    whole body into memory before fetch_page sees it, so a page without
+    Content-Length could blow past MAX_PAGE_BYTES; those are streamed
+    through read_capped uncached instead.
+    """
+    return is_html_page(resp) and resp.headers.get('Content-Length', '').isdigit()
+
+
+def read_capped(resp):
+    """Read at most MAX_PAGE_BYTES of a streamed response body."""
+    body = bytearray()
+    for chunk in resp.iter_content(64 * 1024):
+        body += chunk
+        if len(body) >= MAX_PAGE_BYTES:
+            break
+    return bytes(body[:MAX_PAGE_BYTES])
+
+
 def fetch_page(session, url, timeout=15):
-    """Fetch a page and return BeautifulSoup object."""
+    """Fetch a page and return its parsed lxml document."""
+    polite_wait(session, url)
     try:
-        resp = session.get(url, timeout=timeout, allow_redirects=True)
-        resp.raise_for_status()
-        return BeautifulSoup(resp.text, 'html.parser')
+        # Stream, so PDFs, images and oversized pages are dropped on their
+        # headers without downloading the body
+        resp = session.get(url, timeout=timeout, allow_redirects=True, stream=True)
+        try:
+            resp.raise_for_status()
+            if not is_html_page(resp):
+                return None
+            content = read_capped(resp)
+        finally:
+            resp.close()
+        # lxml parses in C and sniffs the encoding from the raw bytes
+        doc = html.fromstring(content)
     except:
         return None
+    
+    # Drop scripts, styles and comments (keeping the text after them), so
+    # text_content() only sees what a reader would
+    for node in doc.xpath(INVISIBLE_XPATH):
+        node.drop_tree()
+    return doc
 
 
-def find_staff_pages(session, base_url):
-    """Find staff directory and about/leadership pages."""
-    pages = []
-    soup = fetch_page(session, base_url)
-    if not soup:
-        return pages
+def iter_text_nodes(doc):
+    """Yield (element, text) for every text node, in document order.
     
-    # Keywords that suggest staff/leadership pages
-    keywords = ['staff', 'directory', 'leadership', 'administration', 'cabinet', 
-                'team', 'about', 'contact', 'superintendent', 'board']
+    lxml keeps text on elements rather than as nodes: an element's .text
+    is its first text node, and each child's .tail follows that child.
+    """
+    for event, elem in etree.iterwalk(doc, events=('start', 'end')):
+        if event == 'start':
+            if elem.text:
+                yield elem, elem.text
+        elif elem.tail and elem is not doc:
+            yield elem.getparent(), elem.tail
+
+
+def find_staff_pages(session, base_url, doc=None):
+    """Find staff directory and about/leadership pages.
     
-    seen_urls = set()
-    for link in soup.find_all('a', href=True):
-        href = link.get('href', '').lower()
-        text = link.get_text().lower()
+    doc is the already-parsed homepage, if the caller has it.
+    """
+    if doc is None:
+        doc = fetch_page(session, base_url)
+    if doc is None:
+        return []
+    
+    # Candidate URLs in the order found; dict keys keep them unique
+    pages = {}
+    base_netloc = urlparse(base_url).netloc
+    for link in doc.iter('a'):
+        href = link.get('href')
+        if href is None:
+            continue
         
-        if any(kw in href or kw in text for kw in keywords):
-            full_url = urljoin(base_url, link['href'])
+        if STAFF_PAGE_RE.search(href) or STAFF_PAGE_RE.search(link.text_content()):
+            full_url = urljoin(base_url, href)
             # Stay on same domain
-            if urlparse(full_url).netloc == urlparse(base_url).netloc:
-                if full_url not in seen_urls:
-                    seen_urls.add(full_url)
-                    pages.append(full_url)
+            if urlparse(full_url).netloc == base_netloc:
+                pages.setdefault(full_url)
     
     # Also try common patterns
     common = ['/staff', '/directory', '/administration', '/leadership', 
               '/about/leadership', '/about/administration', '/contact']
     for path in common:
-        url = urljoin(base_url, path)
-        if url not in seen_urls:
-            pages.append(url)
+        pages.setdefault(urljoin(base_url, path))
     
-    return pages[:10]  # Limit to 10 pages
+    return list(pages)[:10]  # Limit to 10 pages
 
 
 def looks_like_name(text):
@@ -118,12 +269,7 @@ def looks_like_name(text):
     if len(words) < 2 or len(words) > 5:
         return False
     
-    # Common non-name words
-    bad_words = ['the', 'our', 'meet', 'contact', 'about', 'office', 'department',
-                 'district', 'school', 'public', 'services', 'board', 'click',
-                 'view', 'read', 'more', 'home', 'page', 'menu', 'search',
-                 'phone', 'email', 'fax', 'address', 'location']
-    if any(w.lower() in bad_words for w in words):
+    if any(w.lower() in NON_NAME_WORDS for w in words):
         return False
     
     # First word should start with capital
@@ -137,84 +283,88 @@ def looks_like_name(text):
     return False
 
 
-def extract_contacts_strict(soup, url):
-    """Extract contacts with strict quality checks - must have email."""
-    contacts = []
-    page_text = soup.get_text()
+def describe_block(parent):
+    """Return (title, name, phone) found in a contact container."""
+    parent_text = parent.text_content()
     
-    # Find all emails on page
-    all_emails = EMAIL_PATTERN.findall(page_text)
+    # Find title match (the first one in the block)
+    title_match = TITLE_RE.search(parent_text)
+    matched_title = title_match.group(0) if title_match else None
     
-    # Filter out generic emails
-    generic_prefixes = ['info@', 'contact@', 'support@', 'admin@', 'webmaster@', 
-                        'noreply@', 'help@', 'office@', 'communications@', 'hr@']
-    person_emails = [e for e in all_emails 
-                     if not any(e.lower().startswith(g) for g in generic_prefixes)]
+    # Find name - look in headings, bold, strong, links (lazily, in
+    # document order, stopping at the first that looks like a name)
+    name = None
+    for tag in parent.iterdescendants(*NAME_TAGS):
+        tag_text = tag.text_content().strip()
+        if looks_like_name(tag_text):
+            name = tag_text
+            break
     
-    if not person_emails:
-        return contacts
+    # If no name found in markup, try to extract from text near email
+    if not name:
+        for line_match in LINE_RE.finditer(parent_text):
+            line = line_match.group(0).strip()
+            if looks_like_name(line):
+                name = line
+                break
     
-    # For each email, try to find associated name and title
-    for email in set(person_emails):
-        # Find elements containing this email
-        email_elements = soup.find_all(string=re.compile(re.escape(email)))
-        
-        for elem in email_elements:
-            # Look in parent containers for name/title
-            parent = elem.find_parent(['div', 'li', 'tr', 'td', 'article', 'section', 'p'])
-            if not parent:
+    # Find phone (the first one in the block)
+    phone_match = PHONE_PATTERN.search(parent_text)
+    phone = phone_match.group(0) if phone_match else None
+    
+    return matched_title, name, phone
+
+
+def extract_contacts_strict(doc, url):
+    """Extract contacts with strict quality checks - must have email."""
+    contacts = {}  # keyed by lower-cased email, first one found wins
+    
+    # One walk over the text nodes: note the container blocks holding
+    # each personal email, in page order. Text nodes of the same element
+    # share one ancestor lookup.
+    containers = {}
+    email_blocks = {}
+    for elem, text in iter_text_nodes(doc):
+        if '@' not in text:
+            continue
+        for email in EMAIL_PATTERN.findall(text):
+            # Filter out generic emails
+            if email.lower().startswith(GENERIC_EMAIL_PREFIXES):
                 continue
-            
-            parent_text = parent.get_text()
-            
-            # Find title match
-            matched_title = None
-            for title in TARGET_TITLES:
-                if title in parent_text.lower():
-                    matched_title = title
-                    break
-            
-            # Find name - look in headings, bold, strong, links
-            name = None
-            for tag in parent.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'strong', 'b']):
-                tag_text = tag.get_text().strip()
-                if looks_like_name(tag_text):
-                    name = tag_text
-                    break
-            
-            # If no name found in markup, try to extract from text near email
-            if not name:
-                lines = parent_text.split('\n')
-                for line in lines:
-                    line = line.strip()
-                    if looks_like_name(line):
-                        name = line
-                        break
-            
-            # Find phone
-            phones = PHONE_PATTERN.findall(parent_text)
-            phone = phones[0] if phones else None
+            if elem not in containers:
+                containers[elem] = next(
+                    (e for e in chain([elem], elem.iterancestors()) if e.tag in CONTAINER_TAGS), None)
+            parent = containers[elem]
+            if parent is None:
+                continue
+            parents = email_blocks.setdefault(email, [])
+            if parent not in parents:
+                parents.append(parent)
+    
+    # Emails in the same container share one title/name/phone lookup
+    blocks = {}
+    
+    # For each email, try to find associated name and title
+    for email, parents in email_blocks.items():
+        key = email.lower()
+        if key in contacts:
+            continue
+        for parent in parents:
+            if parent not in blocks:
+                blocks[parent] = describe_block(parent)
+            matched_title, name, phone = blocks[parent]
             
             # Only add if we have a name
             if name:
-                contacts.append({
+                contacts[key] = {
                     'name': name,
                     'email': email,
                     'title': matched_title.title() if matched_title else None,
                     'phone': phone,
-                })
+                }
                 break  # Only add once per email
     
-    # Dedupe
-    seen = set()
-    unique = []
-    for c in contacts:
-        key = c['email'].lower()
-        if key not in seen:
-            seen.add(key)
-            unique.append(c)
-    
-    return unique
+    return list(contacts.values())
 
 
 def scrape_district(district, session):
@@ -234,28 +384,27 @@ def scrape_district(district, session):
     }
     
     try:
-        # Find staff/directory pages
-        pages_to_check = find_staff_pages(session, website)
-        pages_to_check.insert(0, website)  # Include homepage
+        # Fetch the homepage once: it is both where staff page links come
+        # from and the first page checked for contacts
+        homepage = fetch_page(session, website)
         
-        all_contacts = []
-        seen_emails = set()
+        # Find staff/directory pages, homepage first, without repeats
+        pages_to_check = list(dict.fromkeys(
+            [website] + find_staff_pages(session, website, homepage)))
+        
+        all_contacts = {}  # keyed by lower-cased email across pages
         
         for page_url in pages_to_check[:8]:  # Check up to 8 pages
             result['pages_checked'] += 1
-            soup = fetch_page(session, page_url)
-            if not soup:
+            doc = homepage if page_url == website else fetch_page(session, page_url)
+            if doc is None:
                 continue
             
-            page_contacts = extract_contacts_strict(soup, page_url)
+            page_contacts = extract_contacts_strict(doc, page_url)
             for c in page_contacts:
-                if c['email'].lower() not in seen_emails:
-                    seen_emails.add(c['email'].lower())
-                    all_contacts.append(c)
-            
-            time.sleep(0.5)  # Be polite
+                all_contacts.setdefault(c['email'].lower(), c)
         
-        result['contacts'] = all_contacts
+        result['contacts'] = list(all_contacts.values())
         
     except Exception as e:
         result['error'] = str(e)
@@ -306,29 +455,32 @@ def main():
     districts_with_sites = [d for d in data['districts'] if d.get('website')]
     print(f"Scraping {len(districts_with_sites)} districts with known websites...", flush=True)
     
-    session = get_session()
-    
-    for i, district in enumerate(districts_with_sites):
-        print(f"  [{i+1}/{len(districts_with_sites)}] {district['name']}...", end=" ", flush=True)
-        result = scrape_district(district, session)
-        
-        if result:
-            district['contacts'] = result['contacts']
-            print(f"found {len(result['contacts'])} contacts ({result['pages_checked']} pages)", flush=True)
-        else:
-            print("skipped", flush=True)
-        
-        time.sleep(1)
+    # Each worker thread scrapes with its own session; results are applied
+    # here on the main thread as they finish
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        futures = {
+            pool.submit(lambda d: scrape_district(d, worker_session()), district): district
+            for district in districts_with_sites
+        }
+        for i, future in enumerate(as_completed(futures)):
+            district = futures[future]
+            result = future.result()
+            
+            print(f"  [{i+1}/{len(districts_with_sites)}] {district['name']}...", end=" ", flush=True)
+            if result:
+                district['contacts'] = result['contacts']
+                print(f"found {len(result['contacts'])} contacts ({result['pages_checked']} pages)", flush=True)
+            else:
+                print("skipped", flush=True)
     
     # Save
     output_path = DATA_DIR / "districts.json"
-    with open(output_path, "w") as f:
-        json.dump(data, f, indent=2)
+    output_path.write_text(json.dumps(data, indent=2))
     print(f"\nSaved to {output_path}", flush=True)
     
+    # Encoded once; the docs copy is the same bytes
     docs_path = DOCS_DIR / "data.json"
-    with open(docs_path, "w") as f:
-        json.dump(data, f, indent=2)
+    shutil.copyfile(output_path, docs_path)
     print(f"Copied to {docs_path}", flush=True)
     
     # Summary
@@ -6,22 +6,36 @@ These are gold for sales teams - active buying signals.
 
 import json
 import re
+import shutil
 import time
 from datetime import datetime, timedelta
-import requests
+import requests_cache
 from bs4 import BeautifulSoup
+from pathlib import Path
 
 HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
 
+# Portal pages are cached on disk for a day, so re-runs don't re-download
+# them
+SESSION = requests_cache.CachedSession(
+    Path(__file__).resolve().parent.parent / '.http_cache',
+    expire_after=timedelta(days=1),
+    allowable_codes=(200, 301, 302),
+)
+SESSION.headers.update(HEADERS)
+
+# Class names of likely bid-listing containers on BidNet
+BID_CLASS_RE = re.compile(r'bid|result|listing', re.I)
+
 def load_districts():
     with open('data/districts.json') as f:
         return json.load(f)
 
 def save_districts(data):
+    # Encode once in one shot, then copy the file for the docs UI
     with open('data/districts.json', 'w') as f:
-        json.dump(data, f, indent=2)
-    with open('docs/data.json', 'w') as f:
-        json.dump(data, f, indent=2)
+        f.write(json.dumps(data, indent=2))
+    shutil.copyfile('data/districts.json', 'docs/data.json')
 
 def scrape_wa_webs():
     """
@@ -36,15 +50,14 @@ def scrape_wa_webs():
     url = "https://pr-webs-vendor.des.wa.gov/Search.aspx"
     
     try:
-        session = requests.Session()
-        resp = session.get("https://pr-webs-vendor.des.wa.gov/", headers=HEADERS, timeout=15)
+        resp = SESSION.get("https://pr-webs-vendor.des.wa.gov/", timeout=15)
         print(f"  WEBS homepage: {resp.status_code}")
         
         # Try the bid search
         search_url = "https://fortress.wa.gov/ga/webs/bidcalendar.aspx"
-        resp = session.get(search_url, headers=HEADERS, timeout=15)
+        resp = SESSION.get(search_url, timeout=15)
         if resp.ok:
-            soup = BeautifulSoup(resp.text, 'html.parser')
+            soup = BeautifulSoup(resp.content, 'lxml')
             
             # Look for education/school keywords in active bids
             text = soup.get_text().lower()
@@ -74,11 +87,11 @@ def scrape_tx_comptroller():
     url = "https://www.txsmartbuy.com/esbdSearch"
     
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=15)
+        resp = SESSION.get(url, timeout=15)
         print(f"  TxSmartBuy: {resp.status_code}")
         
         if resp.ok:
-            soup = BeautifulSoup(resp.text, 'html.parser')
+            soup = BeautifulSoup(resp.content, 'lxml')
             # Look for search functionality
             forms = soup.find_all('form')
             print(f"  Found {len(forms)} forms")
@@ -96,7 +109,7 @@ def scrape_ca_caleprocure():
     url = "https://caleprocure.ca.gov/pages/PublicSearch/supplier-702702702702-publicSearch.xhtml"
     
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=15, allow_redirects=True)
+        resp = SESSION.get(url, timeout=15, allow_redirects=True)
         print(f"  CaleProcure: {resp.status_code}")
         
     except Exception as e:
@@ -112,7 +125,7 @@ def scrape_govwin():
     url = "https://iq.govwin.com/neo/marketAnalysis/view/Education/8"
     
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=15)
+        resp = SESSION.get(url, timeout=15)
         print(f"  GovWin status: {resp.status_code}")
         
     except Exception as e:
@@ -133,14 +146,14 @@ def scrape_bidnet():
     }
     
     try:
-        resp = requests.get(url, headers=HEADERS, params=params, timeout=15)
+        resp = SESSION.get(url, params=params, timeout=15)
         print(f"  BidNet search: {resp.status_code}")
         
         if resp.ok:
-            soup = BeautifulSoup(resp.text, 'html.parser')
+            soup = BeautifulSoup(resp.content, 'lxml')
             
             # Look for bid listings
-            results = soup.find_all(['article', 'div'], class_=re.compile(r'bid|result|listing', re.I))
+            results = soup.find_all(['article', 'div'], class_=BID_CLASS_RE)
             print(f"  Found {len(results)} potential bid elements")
             
             # Try to find bid titles
@@ -164,7 +177,7 @@ def scrape_publicsurplus():
     url = "https://marketbrief.edweek.org/"
     
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=15)
+        resp = SESSION.get(url, timeout=15)
         print(f"  EdWeek MarketBrief: {resp.status_code}")
         
     except Exception as e:
@@ -6,62 +6,80 @@ Handles JS-rendered pages that simple requests can't.
 
 import json
 import re
-import time
+import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Districts scraped at once; each runs its own clawdbot process, so the
+# time is spent waiting on the browser rather than in Python
+BROWSER_WORKERS = 4
+
 def load_districts():
     with open('data/districts.json') as f:
         return json.load(f)
 
 def save_districts(data):
+    # Encode once in one shot, then copy the file for the docs UI
     with open('data/districts.json', 'w') as f:
-        json.dump(data, f, indent=2)
-    with open('docs/data.json', 'w') as f:
-        json.dump(data, f, indent=2)
+        f.write(json.dumps(data, indent=2))
+    shutil.copyfile('data/districts.json', 'docs/data.json')
+
+# Common title patterns, with the label each maps to
+TITLE_PATTERNS = [
+    (r'(?:chief\s+)?technology\s+(?:officer|director)', 'Technology Director'),
+    (r'(?:chief\s+)?information\s+(?:officer|director)', 'Chief Information Officer'),
+    (r'(?:chief\s+)?academic\s+(?:officer|director)', 'Chief Academic Officer'),
+    (r'curriculum\s+(?:director|coordinator)', 'Curriculum Director'),
+    (r'(?:assistant|associate)\s+superintendent', 'Assistant Superintendent'),
+    (r'director\s+of\s+(?:technology|it|information)', 'Director of Technology'),
+    (r'director\s+of\s+(?:curriculum|instruction)', 'Director of Curriculum'),
+    (r'(?:it|tech)\s+director', 'IT Director'),
+]
+
+# All title patterns as one alternation, so the page is scanned once; the
+# named group that matched identifies the label
+TITLE_RE = re.compile(
+    '|'.join(f'(?P<t{i}>{pattern})' for i, (pattern, _) in enumerate(TITLE_PATTERNS)),
+    re.I,
+)
+TITLE_LABELS = {f't{i}': title for i, (_, title) in enumerate(TITLE_PATTERNS)}
+
+# Matches only start at the beginning of a run of address characters, so
+# a failing search stays linear in the text length
+EMAIL_RE = re.compile(r'(?<![\w.+-])[\w.+-]+@[\w-]+\.[\w.-]+')
+NAME_RE = re.compile(r'([A-Z][a-z]+(?:\s+[A-Z]\.?)?\s+[A-Z][a-z]+)')
+
+# Existing contact titles that already cover the tech role
+TECH_TITLE_RE = re.compile(r'tech|\bcio\b|\bcto\b', re.I)
 
 def extract_contacts_from_text(text):
     """Extract contact info from page text."""
     contacts = []
     
-    # Common title patterns
-    title_patterns = [
-        (r'(?:chief\s+)?technology\s+(?:officer|director)', 'Technology Director'),
-        (r'(?:chief\s+)?information\s+(?:officer|director)', 'Chief Information Officer'),
-        (r'(?:chief\s+)?academic\s+(?:officer|director)', 'Chief Academic Officer'),
-        (r'curriculum\s+(?:director|coordinator)', 'Curriculum Director'),
-        (r'(?:assistant|associate)\s+superintendent', 'Assistant Superintendent'),
-        (r'director\s+of\s+(?:technology|it|information)', 'Director of Technology'),
-        (r'director\s+of\s+(?:curriculum|instruction)', 'Director of Curriculum'),
-        (r'(?:it|tech)\s+director', 'IT Director'),
-    ]
-    
-    # Find emails
-    emails = re.findall(r'[\w.+-]+@[\w-]+\.[\w.-]+', text.lower())
-    
-    # Find names near titles
-    for pattern, title in title_patterns:
-        matches = list(re.finditer(pattern, text.lower()))
-        for match in matches:
-            # Look for name nearby (within 200 chars before or after)
-            start = max(0, match.start() - 200)
-            end = min(len(text), match.end() + 200)
-            context = text[start:end]
+    # Find names near titles, in one pass over the text
+    for match in TITLE_RE.finditer(text):
+        title = TITLE_LABELS[match.lastgroup]
+        
+        # Look for name nearby (within 200 chars before or after)
+        start = max(0, match.start() - 200)
+        end = min(len(text), match.end() + 200)
+        context = text[start:end]
+        
+        # Look for name pattern
+        name_match = NAME_RE.search(context)
+        if name_match:
+            name = name_match.group(1)
+            # Find email in context
+            email_match = EMAIL_RE.search(context)
+            email = email_match.group(0).lower() if email_match else None
             
-            # Look for name pattern
-            name_match = re.search(r'([A-Z][a-z]+(?:\s+[A-Z]\.?)?\s+[A-Z][a-z]+)', context)
-            if name_match:
-                name = name_match.group(1)
-                # Find email in context
-                email_match = re.search(r'[\w.+-]+@[\w-]+\.[\w.-]+', context.lower())
-                email = email_match.group(0) if email_match else None
-                
-                contacts.append({
-                    'name': name,
-                    'title': title,
-                    'email': email,
-                    'source': 'Website scrape'
-                })
+            contacts.append({
+                'name': name,
+                'title': title,
+                'email': email,
+                'source': 'Website scrape'
+            })
     
     return contacts
 
@@ -88,7 +106,6 @@ def scrape_district_with_browser(district_name, website):
     
     for path in paths[:3]:  # Try first 3 paths to save time
         url = website.rstrip('/') + path
-        print(f"    Trying {path}...", end=' ', flush=True)
         
         try:
             # Use clawdbot browser snapshot
@@ -102,15 +119,15 @@ def scrape_district_with_browser(district_name, website):
                 text = result.stdout
                 contacts = extract_contacts_from_text(text)
                 if contacts:
-                    print(f"Found {len(contacts)} contacts!")
+                    print(f"    [{district_name}] {path}: Found {len(contacts)} contacts!")
                     all_contacts.extend(contacts)
                     break  # Got contacts, stop trying paths
                 else:
-                    print("No contacts found")
+                    print(f"    [{district_name}] {path}: No contacts found")
             else:
-                print("Failed")
+                print(f"    [{district_name}] {path}: Failed")
         except Exception as e:
-            print(f"Error: {e}")
+            print(f"    [{district_name}] {path}: Error: {e}")
     
     # Deduplicate by name
     seen = set()
@@ -142,27 +159,27 @@ def main():
             continue
         
         # Check if already has tech director
-        has_tech = any(
-            'tech' in (c.get('title') or '').lower() or 
-            'cio' in (c.get('title') or '').lower() or
-            'cto' in (c.get('title') or '').lower()
-            for c in d.get('contacts', [])
-        )
+        has_tech = any(TECH_TITLE_RE.search(c.get('title') or '') for c in d.get('contacts', []))
         if not has_tech:
             districts_to_scrape.append(d)
     
     print(f"\nFound {len(districts_to_scrape)} districts to scrape (>10k enrollment, no tech director)")
     print("=" * 60)
     
+    batch = districts_to_scrape[:20]  # Limit to 20 for now
+    
+    # Scrape several districts at once (different sites, so no one
+    # server sees more than a single browser)
+    with ThreadPoolExecutor(BROWSER_WORKERS) as pool:
+        results = list(pool.map(
+            lambda d: scrape_district_with_browser(d['name'], d['website']), batch))
+    
     updated = 0
-    for i, district in enumerate(districts_to_scrape[:20]):  # Limit to 20 for now
+    for i, (district, contacts) in enumerate(zip(batch, results)):
         name = district['name']
-        website = district['website']
-        
-        print(f"\n[{i+1}/{min(20, len(districts_to_scrape))}] {name}")
-        print(f"    Website: {website}")
         
-        contacts = scrape_district_with_browser(name, website)
+        print(f"\n[{i+1}/{len(batch)}] {name}")
+        print(f"    Website: {district['website']}")
         
         if contacts:
             if 'contacts' not in district:
@@ -175,8 +192,6 @@ def main():
                     district['contacts'].append(c)
                     print(f"    ✓ Added: {c['name']} ({c['title']})")
                     updated += 1
-        
-        time.sleep(1)  # Be polite
     
     save_districts(data)
     
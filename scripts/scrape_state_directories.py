@@ -4,23 +4,83 @@ Scrape state education directories for district staff contacts.
 These are official sources with structured data.
 """
 
+import io
 import json
 import re
-import time
-import requests
-from bs4 import BeautifulSoup
+import shutil
+import requests_cache
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from pathlib import Path
 
 HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
 
+# One keep-alive session for every state site, so repeat requests to a
+# host reuse its connection instead of a new TCP/TLS handshake each time.
+# Pages are cached on disk for half a day (and a stale copy is used if a
+# site is down), so re-runs don't re-download them. After that, expired
+# pages are revalidated with If-None-Match / If-Modified-Since, so an
+# unchanged page costs a 304 instead of its whole body
+SESSION = requests_cache.CachedSession(
+    Path(__file__).resolve().parent.parent / '.http_cache',
+    expire_after=timedelta(hours=12),
+    stale_if_error=True,
+)
+SESSION.headers.update(HEADERS)
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+    ),
+)
+SESSION.mount('https://', _adapter)
+SESSION.mount('http://', _adapter)
+
+# Pages each scraper reads
+WA_DISTRICTS = [
+    ('Seattle School District No. 1', '103300'),
+    ('Spokane School District 81', '105000'),
+    ('Tacoma School District 10', '102700'),
+]
+WA_REPORT_CARD_URL = "https://washingtonstatereportcard.ospi.k12.wa.us/ReportCard/ViewSchoolOrDistrict/{}"
+TX_ASKTED_URL = "https://tealprod.tea.state.tx.us/Tea.AskTed.Web/Forms/Home.aspx"
+CA_PUBSCHLS_URL = "https://www.cde.ca.gov/ds/si/ds/pubschls.asp"
+FL_SUPERINTENDENTS_URL = "https://www.fldoe.org/accountability/data-sys/school-dis-data/superintendents.stml"
+
+# Address in a mailto: link, without any ?subject=... part
+MAILTO_RE = re.compile(r'\s*mailto:([^?\s]+)', re.I)
+
+# Requests started ahead of time by prefetch(), by URL
+_prefetched = {}
+
+def prefetch(pool, urls):
+    """Start fetching every page up front, so the network waits overlap."""
+    for url in urls:
+        _prefetched[url] = pool.submit(SESSION.get, url, timeout=15)
+
+def fetch(url):
+    """GET a page, using its prefetched response when there is one."""
+    future = _prefetched.pop(url, None)
+    if future is not None:
+        return future.result()
+    return SESSION.get(url, timeout=15)
+
 def load_districts():
     with open('data/districts.json') as f:
         return json.load(f)
 
 def save_districts(data):
+    # Encode once in one shot, then copy the file for the docs UI
     with open('data/districts.json', 'w') as f:
-        json.dump(data, f, indent=2)
-    with open('docs/data.json', 'w') as f:
-        json.dump(data, f, indent=2)
+        f.write(json.dumps(data, indent=2))
+    shutil.copyfile('data/districts.json', 'docs/data.json')
 
 def scrape_wa_k12_directory():
     """
@@ -29,27 +89,25 @@ def scrape_wa_k12_directory():
     print("Scraping Washington directory...")
     contacts = {}
     
-    # Try OSPI report card - has superintendent names
-    districts = [
-        ('Seattle School District No. 1', '103300'),
-        ('Spokane School District 81', '105000'),
-        ('Tacoma School District 10', '102700'),
-    ]
-    
-    for name, code in districts:
-        url = f"https://washingtonstatereportcard.ospi.k12.wa.us/ReportCard/ViewSchoolOrDistrict/{code}"
-        print(f"  Checking {name}...")
-        try:
-            resp = requests.get(url, headers=HEADERS, timeout=15)
-            if resp.ok:
-                # Look for superintendent info
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                text = soup.get_text()
-                if 'superintendent' in text.lower():
-                    print(f"    Has superintendent data")
-        except Exception as e:
-            print(f"    Error: {e}")
-        time.sleep(1)
+    # Try OSPI report card - has superintendent names. The pages don't
+    # depend on each other, so request them all at once (unless main()
+    # already has) and read them in order
+    urls = [WA_REPORT_CARD_URL.format(code) for _, code in WA_DISTRICTS]
+    with ThreadPoolExecutor(len(urls)) as pool:
+        prefetch(pool, [url for url in urls if url not in _prefetched])
+        
+        for (name, _), url in zip(WA_DISTRICTS, urls):
+            print(f"  Checking {name}...")
+            try:
+                resp = fetch(url)
+                if resp.ok:
+                    # Look for superintendent info
+                    soup = BeautifulSoup(resp.content, 'lxml')
+                    text = soup.get_text()
+                    if 'superintendent' in text.lower():
+                        print(f"    Has superintendent data")
+            except Exception as e:
+                print(f"    Error: {e}")
     
     return contacts
 
@@ -62,13 +120,12 @@ def scrape_texas_tea():
     
     # TEA has AskTED database
     # https://tealprod.tea.state.tx.us/Tea.AskTed.Web/Forms/Home.aspx
-    url = "https://tealprod.tea.state.tx.us/Tea.AskTed.Web/Forms/Home.aspx"
-    
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=15)
+        resp = fetch(TX_ASKTED_URL)
         print(f"  TEA AskTED status: {resp.status_code}")
         if resp.ok:
-            soup = BeautifulSoup(resp.text, 'html.parser')
+            # Only the forms are counted, so only they are built
+            soup = BeautifulSoup(resp.content, 'lxml', parse_only=SoupStrainer('form'))
             forms = soup.find_all('form')
             print(f"  Found {len(forms)} forms")
     except Exception as e:
@@ -83,12 +140,10 @@ def scrape_ca_cde():
     
     # CDE has downloadable text files
     # https://www.cde.ca.gov/ds/si/ds/pubschls.asp - public schools
-    url = "https://www.cde.ca.gov/ds/si/ds/pubschls.asp"
-    
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=15)
+        resp = fetch(CA_PUBSCHLS_URL)
         if resp.ok:
-            soup = BeautifulSoup(resp.text, 'html.parser')
+            soup = BeautifulSoup(resp.content, 'lxml', parse_only=SoupStrainer('a', href=True))
             # Look for download links
             links = soup.find_all('a', href=True)
             download_links = [l for l in links if 'download' in l.text.lower() or '.txt' in l['href'].lower()]
@@ -98,49 +153,93 @@ def scrape_ca_cde():
     except Exception as e:
         print(f"  Error: {e}")
 
+def parse_fl_row(row):
+    """Return the contact in one FLDOE table row, or None."""
+    cells = row.xpath('.//td|.//th')
+    if len(cells) < 2:
+        return None
+    
+    district = ''.join(cells[0].itertext()).strip()
+    supt = ''.join(cells[1].itertext()).strip() if len(cells) > 1 else ''
+    email_cell = cells[2] if len(cells) > 2 else None
+    
+    # Extract email from link
+    email = None
+    if email_cell is not None:
+        hrefs = email_cell.xpath('.//a/@href')
+        match = MAILTO_RE.match(hrefs[0]) if hrefs else None
+        if match:
+            email = match.group(1)
+    
+    if district and supt:
+        return {
+            'district': district,
+            'name': supt,
+            'email': email
+        }
+    return None
+
 def scrape_fl_fldoe():
     """
     Florida DOE school directory.
     """
     print("\nScraping Florida FLDOE directory...")
     
-    url = "https://www.fldoe.org/accountability/data-sys/school-dis-data/superintendents.stml"
-    
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=15)
+        resp = fetch(FL_SUPERINTENDENTS_URL)
         if resp.ok:
-            soup = BeautifulSoup(resp.text, 'html.parser')
+            # Parse the page incrementally: each row of the first table
+            # is read as soon as it has been parsed, then dropped, so the
+            # rows don't pile up in the tree (the rest of the page is
+            # kept; only its tables are counted)
+            tables = 0
+            first_table = None
+            in_first_table = False
+            rows = 0
+            row_index = {}  # open row -> its position in the table
+            found = []      # (position, contact)
+            events = etree.iterparse(
+                io.BytesIO(resp.content), events=('start', 'end'), tag=('table', 'tr'), html=True)
+            for event, elem in events:
+                if elem.tag == 'table':
+                    if event == 'start':
+                        tables += 1
+                        if first_table is None:
+                            first_table, in_first_table = elem, True
+                    elif elem is first_table:
+                        in_first_table = False
+                    continue
+                
+                if not in_first_table:
+                    continue
+                
+                if event == 'start':
+                    row_index[elem] = rows
+                    rows += 1
+                    continue
+                
+                # A row is complete at its end tag; nested rows finish
+                # before the row around them, so keep the start position
+                # to report them in page order
+                position = row_index.pop(elem)
+                if position > 0:  # Skip header
+                    contact = parse_fl_row(elem)
+                    if contact:
+                        found.append((position, contact))
+                
+                # Rows nested in another row are still part of it
+                if not row_index:
+                    elem.clear()
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+            
+            contacts = [contact for _, contact in sorted(found, key=lambda f: f[0])]
             
             # This page lists all FL superintendents!
-            tables = soup.find_all('table')
-            print(f"  Found {len(tables)} tables")
+            print(f"  Found {tables} tables")
             
             if tables:
-                rows = tables[0].find_all('tr')
-                print(f"  Found {len(rows)} rows in first table")
-                
-                contacts = []
-                for row in rows[1:]:  # Skip header
-                    cells = row.find_all(['td', 'th'])
-                    if len(cells) >= 2:
-                        district = cells[0].get_text().strip()
-                        supt = cells[1].get_text().strip() if len(cells) > 1 else ''
-                        email_cell = cells[2] if len(cells) > 2 else None
-                        
-                        # Extract email from link
-                        email = None
-                        if email_cell:
-                            link = email_cell.find('a', href=True)
-                            if link and 'mailto:' in link['href']:
-                                email = link['href'].replace('mailto:', '')
-                        
-                        if district and supt:
-                            contacts.append({
-                                'district': district,
-                                'name': supt,
-                                'email': email
-                            })
-                
+                print(f"  Found {rows} rows in first table")
                 print(f"  Extracted {len(contacts)} FL superintendents!")
                 return contacts
     except Exception as e:
@@ -153,53 +252,63 @@ def main():
     print("State Directory Scraper")
     print("=" * 60)
     
-    # Florida has the best superintendent list
-    fl_contacts = scrape_fl_fldoe()
-    
-    if fl_contacts:
-        print(f"\nUpdating Florida districts with {len(fl_contacts)} superintendents...")
+    # Every page is on an independent site (or a handful on OSPI's), so
+    # request them all at once; the scrapers below then read them in order
+    urls = [FL_SUPERINTENDENTS_URL]
+    urls += [WA_REPORT_CARD_URL.format(code) for _, code in WA_DISTRICTS]
+    urls += [TX_ASKTED_URL, CA_PUBSCHLS_URL]
+    with ThreadPoolExecutor(len(urls)) as pool:
+        prefetch(pool, urls)
         
-        data = load_districts()
-        updated = 0
+        # Florida has the best superintendent list
+        fl_contacts = scrape_fl_fldoe()
         
-        for contact in fl_contacts:
-            # Find matching district
-            for d in data['districts']:
-                if d['state'] != 'FL':
-                    continue
-                
-                # Match by name (fuzzy)
-                district_name = d['name'].lower()
-                contact_district = contact['district'].lower()
+        if fl_contacts:
+            print(f"\nUpdating Florida districts with {len(fl_contacts)} superintendents...")
+            
+            data = load_districts()
+            updated = 0
+            
+            # Florida districts with their case-folded names, worked out once
+            # rather than for every contact (casefold also evens out Unicode
+            # case differences that lower() leaves, e.g. "ß" vs "SS")
+            fl_districts = [(d['name'].casefold(), d) for d in data['districts'] if d['state'] == 'FL']
+            
+            for contact in fl_contacts:
+                contact_district = contact['district'].casefold()
+                first_word = contact_district.split()[0]
                 
-                if (contact_district in district_name or 
-                    district_name in contact_district or
-                    contact_district.split()[0] in district_name):
-                    
-                    # Check if already has superintendent
-                    has_supt = any(c.get('title') == 'Superintendent' for c in d.get('contacts', []))
-                    
-                    if not has_supt and contact.get('name'):
-                        if 'contacts' not in d:
-                            d['contacts'] = []
+                # Find matching district
+                for district_name, d in fl_districts:
+                    # Match by name (fuzzy)
+                    if (contact_district in district_name or 
+                        district_name in contact_district or
+                        first_word in district_name):
                         
-                        d['contacts'].insert(0, {
-                            'name': contact['name'],
-                            'title': 'Superintendent',
-                            'email': contact.get('email'),
-                            'source': 'Florida DOE'
-                        })
-                        print(f"  ✓ {d['name']}: {contact['name']}")
-                        updated += 1
-                    break
+                        # Check if already has superintendent
+                        has_supt = any(c.get('title') == 'Superintendent' for c in d.get('contacts', []))
+                        
+                        if not has_supt and contact.get('name'):
+                            if 'contacts' not in d:
+                                d['contacts'] = []
+                            
+                            d['contacts'].insert(0, {
+                                'name': contact['name'],
+                                'title': 'Superintendent',
+                                'email': contact.get('email'),
+                                'source': 'Florida DOE'
+                            })
+                            print(f"  ✓ {d['name']}: {contact['name']}")
+                            updated += 1
+                        break
+            
+            save_districts(data)
+            print(f"\nUpdated {updated} Florida districts")
         
-        save_districts(data)
-        print(f"\nUpdated {updated} Florida districts")
-    
-    # Try other states
-    scrape_wa_k12_directory()
-    scrape_texas_tea()
-    scrape_ca_cde()
+        # Try other states
+        scrape_wa_k12_directory()
+        scrape_texas_tea()
+        scrape_ca_cde()
     
     print("\n" + "=" * 60)
     print("Done!")
@@ -8,49 +8,125 @@ import re
 import csv
 import io
 import time
-import requests
+import zipfile
+import requests_cache
+from bs4 import BeautifulSoup
+from datetime import timedelta
+from itertools import islice
+from lxml import html
 from pathlib import Path
+from requests import Request
+from urllib.parse import urlparse
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 }
 
+# Directory pages are cached on disk for half a day (and a stale copy is
+# used if a site is down), so re-runs don't re-download them. After that,
+# expired pages are revalidated with a conditional GET, so an unchanged
+# page costs a 304 instead of its whole body
+SESSION = requests_cache.CachedSession(
+    Path(__file__).resolve().parent.parent / '.http_cache',
+    expire_after=timedelta(hours=12),
+    stale_if_error=True,
+)
+SESSION.headers.update(HEADERS)
+
 TARGET_STATES = ['WA', 'OR', 'CA', 'TX', 'FL', 'NY']
 
+# Requests to the same host are spaced out to be polite; different hosts
+# don't wait on each other
+REQUEST_INTERVAL = 1.0  # seconds between requests to the same host
+_next_request_at = {}  # host -> earliest start of its next request
+
+# CCD LEA directory file (2022-23), from https://nces.ed.gov/ccd/files.asp
+CCD_LEA_ZIP_URL = "https://nces.ed.gov/ccd/Data/zip/ccd_lea_029_2223_w_1a_083023.zip"
+
+# Case-insensitive "mentions a superintendent" test, evaluated by libxml2
+# so non-matching nodes never become Python strings
+MENTIONS_SUPT = "contains(translate(., 'SUPERINTENDENT', 'superintendent'), 'superintendent')"
+# Innermost block elements with page text (not inline JS/CSS) that
+# mentions a superintendent. Whole elements are matched so a name in a
+# child element (<p>Superintendent: <a>Jane Doe</a></p>) stays on the
+# line. Each match has at least one matching line, so the first three
+# elements are enough for three lines.
+BLOCK = (
+    "self::p or self::div or self::li or self::td or self::th or self::dt or self::dd"
+    " or self::h1 or self::h2 or self::h3 or self::h4 or self::h5 or self::h6"
+    " or self::section or self::article or self::body"
+)
+HAS_SUPT_TEXT = f".//text()[not(ancestor::script or ancestor::style)][{MENTIONS_SUPT}]"
+SUPT_TEXT_XPATH = (
+    f"(//*[{BLOCK}][{HAS_SUPT_TEXT}][not(.//*[{BLOCK}][{HAS_SUPT_TEXT}])])"
+    "[position() <= 3]"
+)
+INFOBOX_SUPT_ROWS_XPATH = (
+    "(//table[contains(concat(' ', normalize-space(@class), ' '), ' infobox ')])[1]"
+    f"//tr[{MENTIONS_SUPT}]"
+)
+
+def is_fresh(url):
+    """
+    Whether a GET of url will be answered from the HTTP cache. Expired
+    entries don't count: they are revalidated with a real request.
+    """
+    cached = SESSION.cache.get_response(SESSION.cache.create_key(Request('GET', url)))
+    return cached is not None and not cached.is_expired
+
+def polite_wait(url):
+    """
+    Block until url's host may be requested again. URLs already in the
+    HTTP cache don't wait.
+    """
+    if is_fresh(url):
+        return
+    host = urlparse(url).netloc
+    now = time.monotonic()
+    next_at = _next_request_at.get(host, now)
+    _next_request_at[host] = max(now, next_at) + REQUEST_INTERVAL
+    if next_at > now:
+        time.sleep(next_at - now)
+
 def get_nces_directory():
     """
-    NCES ELSI exports include superintendent names.
-    We'll use their table generator API.
+    NCES CCD LEA (district) directory file - every district nationwide
+    in one CSV, so one download covers all target states.
+    
+    The directory file has no superintendent-name column, so this only
+    returns each district's LEA ID, name, phone and website; names come
+    from the state and Ballotpedia scrapers.
     """
     print("Fetching NCES district directory data...")
     
-    # NCES has a public API for school search
-    # https://nces.ed.gov/ccd/schoolsearch/
+    results = {state: [] for state in TARGET_STATES}
     
-    results = {}
-    
-    for state in TARGET_STATES:
-        print(f"  Searching {state}...")
-        try:
-            # Use their search API
-            url = f"https://nces.ed.gov/ccd/schoolsearch/school_list.asp"
-            params = {
-                'Search': 1,
-                'State': state,
-                'SchoolType': 1,  # Regular schools
-                'SpecificSchlTypes': 'all',
-                'IncGrade': '-1',
-                'LoGrade': '-1',
-                'HiGrade': '-1'
-            }
-            
-            # Actually let's try a direct approach - download their files
-            # CCD LEA (district) file has superintendent
-            
-        except Exception as e:
-            print(f"    Error: {e}")
+    try:
+        resp = SESSION.get(CCD_LEA_ZIP_URL, timeout=120)
+        resp.raise_for_status()
+        
+        # Read the CSV straight out of the archive, one row at a time
+        with zipfile.ZipFile(io.BytesIO(resp.content)) as zf:
+            name = next((n for n in zf.namelist() if n.lower().endswith('.csv')), None)
+            if name is None:
+                print(f"  Error: no CSV file in {CCD_LEA_ZIP_URL}")
+                return results
+            with zf.open(name) as raw:
+                reader = csv.DictReader(io.TextIOWrapper(raw, encoding='latin-1', newline=''))
+                for row in reader:
+                    state = row.get('LSTATE')
+                    if state in results:
+                        results[state].append({
+                            'leaid': row.get('LEAID'),
+                            'name': row.get('LEA_NAME'),
+                            'phone': row.get('PHONE') or None,
+                            'website': row.get('WEBSITE') or None,
+                        })
         
-        time.sleep(0.5)
+        for state, districts in results.items():
+            print(f"  {state}: {len(districts)} districts")
+    except Exception as e:
+        print(f"  Error: {e}")
     
     return results
 
@@ -63,17 +139,12 @@ def scrape_ospi_directory():
     contacts = {}
     base_url = "https://eds.ospi.k12.wa.us"
     
-    # Get the search page
-    session = requests.Session()
-    session.headers.update(HEADERS)
-    
     try:
         # First, get the page to capture any needed tokens
-        resp = session.get(f"{base_url}/DirectoryEDS.aspx", timeout=30)
+        resp = SESSION.get(f"{base_url}/DirectoryEDS.aspx", timeout=30)
         
         # Look for district links in the page
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(resp.text, 'html.parser')
+        soup = BeautifulSoup(resp.content, 'lxml')
         
         # Find all links that might be district pages
         links = soup.find_all('a', href=True)
@@ -116,22 +187,23 @@ def scrape_greatschools():
         url = f"https://www.greatschools.org/{state.lower()}/{city}/{district}/"
         print(f"  Checking {district}...")
         try:
-            resp = requests.get(url, headers=HEADERS, timeout=15)
+            polite_wait(url)
+            resp = SESSION.get(url, timeout=15)
             if resp.ok:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(resp.text, 'html.parser')
+                tree = html.fromstring(resp.content)
                 
-                # Look for superintendent info
-                text = soup.get_text()
-                if 'superintendent' in text.lower():
-                    # Find the context
-                    lines = [l.strip() for l in text.split('\n') if 'superintendent' in l.lower()]
-                    for line in lines[:3]:
-                        print(f"    Found: {line[:100]}")
+                # Look for superintendent info, keeping the lines of the
+                # matching elements that mention it
+                lines = (
+                    l.strip()
+                    for el in tree.xpath(SUPT_TEXT_XPATH)
+                    for l in el.text_content().split('\n')
+                    if 'superintendent' in l.lower()
+                )
+                for line in islice(lines, 3):
+                    print(f"    Found: {line[:100]}")
         except Exception as e:
             print(f"    Error: {e}")
-        
-        time.sleep(1)
 
 def scrape_ballotpedia():
     """
@@ -149,23 +221,16 @@ def scrape_ballotpedia():
         url = f"https://ballotpedia.org/{district}"
         print(f"  Checking {district.split(',')[0]}...")
         try:
-            resp = requests.get(url, headers=HEADERS, timeout=15)
+            polite_wait(url)
+            resp = SESSION.get(url, timeout=15)
             if resp.ok:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(resp.text, 'html.parser')
+                tree = html.fromstring(resp.content)
                 
                 # Look for superintendent in infobox
-                infobox = soup.find('table', class_='infobox')
-                if infobox:
-                    rows = infobox.find_all('tr')
-                    for row in rows:
-                        text = row.get_text()
-                        if 'superintendent' in text.lower():
-                            print(f"    {text.strip()[:80]}")
+                for row in tree.xpath(INFOBOX_SUPT_ROWS_XPATH):
+                    print(f"    {row.text_content().strip()[:80]}")
         except Exception as e:
             print(f"    Error: {e}")
-        
-        time.sleep(1)
 
 def try_direct_state_files():
     """
@@ -195,7 +260,7 @@ def try_direct_state_files():
     try:
         # They have a text file download
         url = "https://www.cde.ca.gov/schooldirectory/report?rid=dl1"
-        resp = requests.head(url, headers=HEADERS, timeout=10, allow_redirects=True)
+        resp = SESSION.head(url, timeout=10, allow_redirects=True)
         print(f"    Status: {resp.status_code}, Content-Type: {resp.headers.get('content-type', 'unknown')}")
     except Exception as e:
         print(f"    Error: {e}")
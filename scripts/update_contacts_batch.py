@@ -4,16 +4,19 @@ Update contacts with verified data from web scraping.
 """
 
 import json
+import shutil
+from bisect import insort
+from collections import defaultdict
 
 def load_districts():
     with open('data/districts.json') as f:
         return json.load(f)
 
 def save_districts(data):
+    # Encode once in one shot, then copy the file for the docs UI
     with open('data/districts.json', 'w') as f:
-        json.dump(data, f, indent=2)
-    with open('docs/data.json', 'w') as f:
-        json.dump(data, f, indent=2)
+        f.write(json.dumps(data, indent=2))
+    shutil.copyfile('data/districts.json', 'docs/data.json')
 
 # Verified contacts from web scraping
 NEW_CONTACTS = {
@@ -42,45 +45,52 @@ def main():
     data = load_districts()
     updated_count = 0
     
+    # Look districts up by name instead of scanning every one; names can
+    # repeat, so each maps to all districts that carry it
+    by_name = defaultdict(list)
     for district in data['districts']:
-        name = district['name']
-        
-        # Check if we have new contacts for this district
-        if name in NEW_CONTACTS:
+        by_name[district['name']].append(district)
+    
+    # Go through the districts we have new contacts for
+    for name, new_contacts in NEW_CONTACTS.items():
+        for district in by_name.get(name, []):
             print(f"\n{name}:")
             
-            if 'contacts' not in district:
-                district['contacts'] = []
-            
-            existing_names = {c.get('name') for c in district['contacts']}
+            # Positions of the district's contacts by their current name,
+            # kept in list order, so each new contact finds its match
+            # without rescanning the list
+            contacts = district.setdefault('contacts', [])
+            positions = defaultdict(list)
+            for i, c in enumerate(contacts):
+                positions[c.get('name')].append(i)
+            existing_names = set(positions)
             
-            for new_contact in NEW_CONTACTS[name]:
+            for new_contact in new_contacts:
                 # Check if we need to update existing or add new
                 if new_contact['name'] in existing_names:
                     # Update existing
-                    for c in district['contacts']:
-                        if c.get('name') == new_contact['name']:
-                            c.update(new_contact)
-                            print(f"  Updated: {new_contact['name']}")
-                            updated_count += 1
-                else:
-                    # Check if this replaces an old contact (e.g., new superintendent)
-                    if name in UPDATES and new_contact['title'] == 'Superintendent':
-                        old_name = UPDATES[name].get('old_superintendent')
-                        for c in district['contacts']:
-                            if c.get('name') == old_name:
-                                print(f"  Replacing {old_name} with {new_contact['name']}")
-                                c.update(new_contact)
-                                updated_count += 1
-                                break
-                        else:
-                            district['contacts'].append(new_contact)
-                            print(f"  Added: {new_contact['name']} ({new_contact['title']})")
-                            updated_count += 1
-                    else:
-                        district['contacts'].append(new_contact)
-                        print(f"  Added: {new_contact['name']} ({new_contact['title']})")
+                    for i in positions[new_contact['name']]:
+                        contacts[i].update(new_contact)
+                        print(f"  Updated: {new_contact['name']}")
+                        updated_count += 1
+                    continue
+                
+                # Check if this replaces an old contact (e.g., new superintendent)
+                if name in UPDATES and new_contact['title'] == 'Superintendent':
+                    old_name = UPDATES[name].get('old_superintendent')
+                    old_positions = positions.get(old_name)
+                    if old_positions:
+                        print(f"  Replacing {old_name} with {new_contact['name']}")
+                        i = old_positions.pop(0)
+                        contacts[i].update(new_contact)
+                        insort(positions[new_contact['name']], i)
                         updated_count += 1
+                        continue
+                
+                positions[new_contact['name']].append(len(contacts))
+                contacts.append(new_contact)
+                print(f"  Added: {new_contact['name']} ({new_contact['title']})")
+                updated_count += 1
     
     save_districts(data)
     
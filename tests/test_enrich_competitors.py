@@ -0,0 +1,43 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import enrich_competitors
+
+
+class MainRoundTripTest(unittest.TestCase):
+    def test_keeps_top_level_keys(self):
+        data = {
+            "meta": {"sources": ["USASpending.gov"]},
+            "programs": {"84.010": "Title I Grants to LEAs"},
+            "districts": [
+                {
+                    "name": "Austin Independent School District",
+                    "state": "TX",
+                    "awards": [{"cfda_code": "84.010", "amount": 100}],
+                },
+            ],
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            (tmp / "districts.json").write_text(json.dumps(data))
+            (tmp / "edclub_subdomains.txt").write_text("austinisd.typingclub.com\n")
+            with mock.patch.object(enrich_competitors, "DATA_DIR", tmp), \
+                    mock.patch("builtins.print"):
+                enrich_competitors.main()
+            out = json.loads((tmp / "districts.json").read_text())
+
+        self.assertEqual(out["programs"], data["programs"])
+        self.assertEqual(out["meta"]["sources"], ["USASpending.gov"])
+        self.assertTrue(out["meta"]["edclub_enrichment"])
+        self.assertEqual(out["districts"][0]["awards"], data["districts"][0]["awards"])
+        self.assertIn("uses_edclub", out["districts"][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import re
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import fetch_all_awards
+
+# Recipient names as they show up in USASpending, including variants
+# whose words differ in order or punctuation from the search term
+RECIPIENTS = [
+    "NEW YORK CITY DEPARTMENT OF EDUCATION",
+    "CITY OF NEW YORK DEPARTMENT OF EDUCATION",
+    "DEPARTMENT OF EDUCATION, NEW YORK CITY",
+    "FAIRFAX COUNTY PUBLIC SCHOOLS",
+    "FAIRFAX COUNTY SCHOOL BOARD",
+    "SCHOOL BOARD OF FAIRFAX COUNTY, VIRGINIA",
+    "CLARK COUNTY SCHOOL DISTRICT",
+    "LEWIS AND CLARK COUNTY",
+    "SEATTLE SCHOOL DIST. #1",
+    "UNRELATED NONPROFIT INC",
+]
+AWARDS = sorted(
+    (
+        {"Recipient Name": name, "Award Amount": 1000 * (i * 7 % 31 + 1) + j, "CFDA Number": "84.010"}
+        for j, name in enumerate(RECIPIENTS)
+        for i in range(6)
+    ),
+    key=lambda a: a["Award Amount"],
+    reverse=True,
+)
+TERMS = ["New York City Department of Education", "Fairfax", "Clark County", "Nowhere"]
+# Recipients the API's keyword search returns for a term even though
+# they don't contain all of its words (abbreviations, plurals, ...)
+LOOSE_MATCHES = {"Seattle School District": {"SEATTLE SCHOOL DIST. #1"}}
+
+
+def tokens(name):
+    return set(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+class FakeResponse:
+    ok = True
+
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class FakeAPI:
+    """spending_by_award stand-in: a recipient matches a search term
+    when it contains all of the term's words or is one of the term's
+    LOOSE_MATCHES, results sorted by amount. Single-term searches fail
+    once fail_single is set."""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail_single = False
+
+    def post(self, url, json, timeout):
+        self.calls += 1
+        terms = json["filters"]["recipient_search_text"]
+        if self.fail_single and len(terms) == 1:
+            raise ConnectionError("connection reset")
+        hits = [
+            a for a in AWARDS
+            if any(
+                tokens(t) <= tokens(a["Recipient Name"])
+                or a["Recipient Name"] in LOOSE_MATCHES.get(t, ())
+                for t in terms
+            )
+        ]
+        limit, page = json["limit"], json["page"]
+        start = (page - 1) * limit
+        return FakeResponse({
+            "results": hits[start:start + limit],
+            "page_metadata": {"page": page, "hasNext": start + limit < len(hits)},
+        })
+
+
+class SearchAwardsTest(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeAPI()
+        for target, value in [("SESSION", self.api), ("PER_TERM", 5), ("PAGE_LIMIT", 4)]:
+            patcher = mock.patch.object(fetch_all_awards, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(fetch_all_awards.time, "sleep")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def per_term(self, terms=TERMS):
+        return {term: fetch_all_awards.search_term_awards(term) for term in terms}
+
+    def test_batch_matches_per_term_search(self):
+        expected = self.per_term()
+        self.assertEqual(fetch_all_awards.search_awards(TERMS), expected)
+        # Word order and punctuation variants are kept
+        names = {a["Recipient Name"] for a in expected["New York City Department of Education"]}
+        self.assertIn("DEPARTMENT OF EDUCATION, NEW YORK CITY", names)
+
+    def test_terms_cut_off_by_page_cap_are_searched_alone(self):
+        expected = self.per_term()
+        with mock.patch.object(fetch_all_awards, "MAX_PAGES", 2):
+            self.api.calls = 0
+            self.assertEqual(fetch_all_awards.search_awards(TERMS), expected)
+        self.assertGreater(self.api.calls, 2)
+
+    def test_loose_api_matches_are_searched_alone(self):
+        terms = TERMS + ["Seattle School District"]
+        expected = self.per_term(terms)
+        self.assertEqual(fetch_all_awards.search_awards(terms), expected)
+        names = {a["Recipient Name"] for a in expected["Seattle School District"]}
+        self.assertEqual(names, {"SEATTLE SCHOOL DIST. #1"})
+
+    def test_only_plausible_owners_are_searched_alone(self):
+        terms = TERMS + ["Seattle School District"]
+        with mock.patch.object(
+            fetch_all_awards, "search_term_awards", wraps=fetch_all_awards.search_term_awards
+        ) as search_alone:
+            fetch_all_awards.search_awards(terms)
+        search_alone.assert_called_once_with("Seattle School District")
+
+    def test_term_without_words_matches_nothing(self):
+        results = fetch_all_awards.search_awards(["Fairfax", "#"])
+        self.assertEqual(results["#"], [])
+        self.assertEqual(results["Fairfax"], self.per_term(["Fairfax"])["Fairfax"])
+
+    def test_failed_search_alone_keeps_batch_hits(self):
+        with mock.patch.object(fetch_all_awards, "MAX_PAGES", 1):
+            with mock.patch.object(fetch_all_awards, "search_term_awards", return_value=[]):
+                batch_only = fetch_all_awards.search_awards(TERMS)
+            self.api.fail_single = True
+            with mock.patch("builtins.print"):
+                results = fetch_all_awards.search_awards(TERMS)
+        self.assertEqual(results, batch_only)
+        self.assertTrue(any(results.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
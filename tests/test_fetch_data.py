@@ -0,0 +1,47 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import fetch_data
+
+
+def recipient(name, state, total):
+    return {
+        "name": name,
+        "state": state,
+        "awards": [],
+        "total_amount": total,
+        "title_i_amount": 0,
+        "recent_awards": 0,
+    }
+
+
+class AddSampleDistrictsTest(unittest.TestCase):
+    def added_names(self, awards_by_district):
+        data = fetch_data.add_sample_districts({"awards_by_district": awards_by_district})
+        return [(d["name"], d["state"]) for d in data["districts"] if d["enrollment"] is None]
+
+    def test_skips_names_containing_or_contained_in_listed_districts(self):
+        wa = {
+            name.upper(): recipient(name, "WA", total)
+            for name, total in [
+                ("Seattle Public Schools", 9_000_000),
+                ("Seattle Public Schools Foundation", 2_000_000),
+                ("Kent School", 2_000_000),
+                ("Renton School District", 4_000_000),
+                ("Renton School District 403", 3_000_000),
+                ("Kent School District", 1_000_000),
+                ("Tiny School District", 500_000),
+            ]
+        }
+        self.assertEqual(self.added_names({"WA": wa}), [("Renton School District", "WA")])
+
+    def test_checks_are_scoped_by_state(self):
+        me = {"PORTLAND PUBLIC SCHOOLS": recipient("Portland Public Schools", "ME", 2_000_000)}
+        self.assertEqual(self.added_names({"ME": me}), [("Portland Public Schools", "ME")])
+
+
+if __name__ == "__main__":
+    unittest.main()